@@ -53,6 +53,8 @@ import TimeIcon from "@mui/icons-material/AccessTime";
 import { ThemeContext } from "../utils/ThemeProvider";
 import { DataContext } from "../utils/DataProvider";
 
+import config from "../config.json";
+
 /**
  * Separator in performance indicators.
  * Source: https://www.npmjs.com/package/react-circular-progressbar
@@ -107,6 +109,10 @@ const InfoIconContainer = (props) => {
 const calcAccuracy = (config) => {
   if (config.model === "high") {
     return 100;
+  } else if (config.model === "compact") {
+    return 60;
+  } else if (config.model === "low") {
+    return 33;
   } else {
     // Medium
     return 66;
@@ -124,6 +130,10 @@ const calcPerformance = (config) => {
   var performance = 0;
   if (config.model === "high") {
     performance = 50;
+  } else if (config.model === "compact") {
+    performance = 85;
+  } else if (config.model === "low") {
+    performance = 95;
   } else {
     // Medium
     performance = 75;
@@ -143,9 +153,42 @@ const calcPerformance = (config) => {
 const ProcessConfig = memo((props) => {
   const { t } = useTranslation();
   const { theme } = useContext(ThemeContext);
-  const { procConfig, setProcConfig } = useContext(DataContext);
+  const { procConfig, setProcConfig, weights } = useContext(DataContext);
   const [accuracy, setAccuracy] = useState(0);
   const [performance, setPerformance] = useState(0);
+  const [availableModels, setAvailableModels] = useState(["high", "medium"]);
+
+  // Darknet models with custom weights do not need the default weights on the server
+  const models = useMemo(
+    () =>
+      ["high", "medium", "compact", "low"].filter(
+        (model) =>
+          availableModels.includes(model) ||
+          (weights !== undefined && model !== "compact")
+      ),
+    [weights, availableModels]
+  );
+
+  /**
+   * In component mounting phase, the function loads models with default weights available on the server.
+   */
+  useEffect(() => {
+    fetch(`${config.server_url}:${config.express_port}/models`)
+      .then((response) => response.json())
+      .then((message) => {
+        setAvailableModels(message);
+      })
+      .catch((error) => {});
+  }, []);
+
+  /**
+   * Function selects the default model if the selected model is not available.
+   */
+  useEffect(() => {
+    if (models.includes(procConfig.model) === false) {
+      setProcConfig((state) => ({ ...state, model: "medium" }));
+    }
+  }, [models, procConfig.model, setProcConfig]);
 
   /**
    * Function toggles tracking option and ensures that options associated
@@ -339,8 +382,11 @@ const ProcessConfig = memo((props) => {
                   }))
                 }
               >
-                <ToggleButton value="high">{t("High")}</ToggleButton>
-                <ToggleButton value="medium">{t("Medium")}</ToggleButton>
+                {models.map((model) => (
+                  <ToggleButton key={model} value={model}>
+                    {t(_.capitalize(model))}
+                  </ToggleButton>
+                ))}
               </ToggleButtonGroup>
               <InfoIconContainer title={t("ModelAccuracyInfo")} />
             </div>
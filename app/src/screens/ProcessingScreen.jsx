@@ -65,13 +65,18 @@ const ProcessingScreen = memo(() => {
 
   const { theme } = useContext(ThemeContext);
   const { weights } = useContext(DataContext);
-  const { description, uploadProgress, weightsProgress, detectionProgress } =
-    useContext(WsContext);
+  const {
+    description,
+    uploadProgress,
+    weightsProgress,
+    detectionProgress,
+    queuePosition,
+  } = useContext(WsContext);
 
   return (
     <div className="container" style={styles.container}>
       <Typography variant="h4" sx={{ margin: 6, color: theme.primary }}>
-        {t(description)}
+        {t(description, { position: queuePosition })}
       </Typography>
       {weights !== undefined && (
         <LinearProgressWithLabel
@@ -47,6 +47,7 @@ export const WsProvider = memo(({ children }) => {
   const [uploadProgress, setUploadProgress] = useState(0);
   const [weightsProgress, setWeightsProgress] = useState(0);
   const [detectionProgress, setDetectionProgress] = useState(0);
+  const [queuePosition, setQueuePosition] = useState(0);
 
   /**
    * Function sends all the data obtained from the user to the server,
@@ -181,6 +182,12 @@ export const WsProvider = memo(({ children }) => {
       imageUploader.submitFiles(faces); // Upload face images before video
     }
 
+    // Position in the queue of jobs waiting for processing
+    socket.on("queue", (position) => {
+      setQueuePosition(position);
+      setDescription("Queued");
+    });
+
     // Value of progress bar for video processing
     socket.on("progress", (progress) => {
       setDetectionProgress(progress);
@@ -255,6 +262,7 @@ export const WsProvider = memo(({ children }) => {
         uploadProgress: uploadProgress,
         weightsProgress: weightsProgress,
         detectionProgress: detectionProgress,
+        queuePosition: queuePosition,
       }}
     >
       {children}
@@ -11,7 +11,7 @@ const utils = require("./utils");
 
 const fs = require("fs");
 const path = require("path");
-const { spawn } = require("child_process");
+const WorkerPool = require("./workerPool");
 
 var SocketIOFileUpload = require("socketio-file-upload");
 
@@ -50,13 +50,24 @@ if (fs.existsSync(videoDir) === false) {
 
 console.log("Videos: " + videoDir);
 
+/**
+ * Setup pool of python workers.
+ */
+const workerPool = new WorkerPool(
+  config.python_program,
+  config.python_workers,
+  "./src",
+  config.max_jobs,
+  config.max_client_jobs
+);
+
 /**
  * Socket.io
  */
 io.on("connection", (socket) => {
   var videoPath = "";
   var weightsPath = undefined;
-  var pythonProcess = undefined;
+  var pythonJob = undefined;
 
   const clientTmpDir = path.join(tmpDir, socket.id);
   fs.mkdirSync(clientTmpDir);
@@ -103,13 +114,20 @@ io.on("connection", (socket) => {
   });
 
   socket.on("start-detection", (data) => {
+    // Only one job per connection, the client is told that the request was rejected
+    if (pythonJob !== undefined) {
+      console.log("Rejected: job of the connection is already queued or running");
+      socket.emit("process_error", "Job is already queued or running.");
+      return;
+    }
+
     console.log("Processing: " + videoPath);
     const args = utils.parseArgsCLI({ ...data, weights: weightsPath });
 
-    pythonProcess = spawn(
-      "python",
+    // Clients are identified by their address, clients behind one NAT or proxy share the limit
+    pythonJob = workerPool.submit(
+      socket.handshake.address,
       [
-        config.python_program,
         "--input",
         videoPath,
         "--output",
@@ -120,45 +138,35 @@ io.on("connection", (socket) => {
         clientDatabaseDir,
       ].concat(args),
       {
-        cwd: "./src",
+        onQueue: (position) => {
+          socket.emit("queue", position);
+        },
+        onProgress: (progress) => {
+          socket.emit("progress", progress);
+        },
+        onFinish: (code) => {
+          console.log("Python ended with: " + code);
+          pythonJob = undefined;
+
+          if (code === 0) {
+            socket.emit("processed", {
+              videoURL: `${config.server_url}:${config.express_port}/video/${socket.id}`,
+              downloadURL: `${config.server_url}:${config.express_port}/download/${socket.id}`,
+              dataURL: `${config.server_url}:${config.express_port}/data/${socket.id}`,
+            });
+          } else {
+            socket.emit("process_error", code);
+          }
+
+          utils.rmDirRecursive(clientTmpDir);
+        },
       }
     );
-
-    pythonProcess.stdout.on("data", (data) => {
-      const text = data.toString();
-      // console.log(text);
-      if (text.match(/^Progress:/)) {
-        socket.emit("progress", parseInt(text.split(" ")[1]));
-      }
-    });
-
-    pythonProcess.stderr.on("data", (data) => {
-      console.log(data.toString());
-    });
-
-    pythonProcess.on("close", (code) => {
-      console.log("Python ended with: " + code);
-
-      if (code === 0) {
-        socket.emit("processed", {
-          videoURL: `${config.server_url}:${config.express_port}/video/${socket.id}`,
-          downloadURL: `${config.server_url}:${config.express_port}/download/${socket.id}`,
-          dataURL: `${config.server_url}:${config.express_port}/data/${socket.id}`,
-        });
-      } else {
-        socket.emit("process_error", code);
-      }
-    });
-
-    pythonProcess.on("exit", () => {
-      utils.rmDirRecursive(clientTmpDir);
-    });
   });
 
   socket.on("disconnect", () => {
-    if (pythonProcess !== undefined) {
-      pythonProcess.kill("SIGINT");
-    } else {
+    // Queued job is removed without starting, running job removes the directory when it ends
+    if (pythonJob === undefined || workerPool.cancel(pythonJob) === true) {
       utils.rmDirRecursive(clientTmpDir);
     }
   });
@@ -179,6 +187,11 @@ app.get("/", (req, res) => {
   res.send("Server is running.");
 });
 
+// Models whose default weights are available
+app.get("/models", (req, res) => {
+  res.json(utils.availableModels());
+});
+
 app.listen(config.express_port);
 
 // Delete each video file after 24 hours, check every hour
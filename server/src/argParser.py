@@ -8,10 +8,15 @@ import os
 import sys
 import argparse
 
+from detectionModels import MODELS
 
-def argumentParser():
+
+def argumentParser(argv=None):
     """
     Function parse and check program arguments and returns an object of class ArgumentParser.
+
+    Parameters:
+    argv: List of arguments to be parsed (default: arguments of the program).
     """
 
     parser = argparse.ArgumentParser(
@@ -49,10 +54,36 @@ def argumentParser():
         "--model",
         type=str,
         default="yolo320",
-        choices=["yolo320", "yolo608"],
+        choices=list(MODELS.keys()),
         required=False,
         metavar="MODEL",
-        help="Defines a model for object detection. (default: yolo320)",
+        help="Defines a model for object detection: "
+        + ", ".join(MODELS.keys())
+        + ". (default: yolo320)",
+    )
+    parser.add_argument(
+        "--backend",
+        default="opencv",
+        choices=["opencv", "onnxruntime", "openvino"],
+        required=False,
+        metavar="BACKEND",
+        help="Defines a backend running the detection model: opencv, onnxruntime or openvino. (default: opencv)",
+    )
+    parser.add_argument(
+        "--precision",
+        default="fp32",
+        choices=["fp32", "fp16", "int8"],
+        required=False,
+        metavar="PRECISION",
+        help="Defines precision of the detection model: fp32, fp16 (require '--backend openvino') or int8 (require '--backend onnxruntime' or '--backend openvino' and model created by quantize.py). (default: fp32)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        required=False,
+        metavar="INTEGER",
+        help="Number of threads of the detection backend, 0 for the default of the backend. (default: 0)",
     )
     parser.add_argument(
         "-a",
@@ -63,6 +94,22 @@ def argumentParser():
         metavar="INTEGER",
         help="Defines a detection area as [x, y, width, height]. (default: fullscreen)",
     )
+    parser.add_argument(
+        "--roi",
+        default=False,
+        required=False,
+        metavar="ROI",
+        action=argparse.BooleanOptionalAction,
+        help="Set to detect objects only in the detection area extended by a margin, instead of the full frame. (require: '-a')",
+    )
+    parser.add_argument(
+        "--roi-margin",
+        type=int,
+        default=32,
+        required=False,
+        metavar="INTEGER",
+        help="Margin around the detection area in pixels used in the ROI mode. (require: '--roi', default: 32)",
+    )
     parser.add_argument(
         "-l",
         "--traillen",
@@ -83,10 +130,9 @@ def argumentParser():
     parser.add_argument(
         "-w",
         "--weights",
-        default="yolov3/yolov3.weights",  #  Pretrained weights
         required=False,
         metavar="PATH",
-        help="Path to YOLOv3 weights. (default: Default pretrained weights)",
+        help="Path to weights of the model. (default: Default pretrained weights of the model)",
     )
     parser.add_argument(
         "-v",
@@ -115,6 +161,30 @@ def argumentParser():
         action=argparse.BooleanOptionalAction,
         help="Set to recognize people by face.",
     )
+    parser.add_argument(
+        "--recognition-interval",
+        type=int,
+        default=25,
+        required=False,
+        metavar="INTEGER",
+        help="Number of analyzed frames before a tracked person is recognized again. (require '-r' and '-t', default: 25)",
+    )
+    parser.add_argument(
+        "--recognition-min-size",
+        type=int,
+        default=40,
+        required=False,
+        metavar="INTEGER",
+        help="Minimum width and height of a tracked person in pixels to be recognized. (require '-r' and '-t', default: 40)",
+    )
+    parser.add_argument(
+        "--recognition-lock",
+        type=float,
+        default=0.15,
+        required=False,
+        metavar="FLOAT",
+        help="Face distance below which the identity of a tracked person is locked and no longer recognized, 0 to never lock. (require '-r' and '-t', default: 0.15)",
+    )
     parser.add_argument(
         "-t",
         "--tracking",
@@ -152,16 +222,140 @@ def argumentParser():
         help="Set to display current timestamp.",
     )
 
-    parser = parser.parse_args()
+    parser.add_argument(
+        "--class-nms",
+        default=False,
+        required=False,
+        metavar="CLASS_NMS",
+        action=argparse.BooleanOptionalAction,
+        help="Set to apply non-maximum suppression separately for each class.",
+    )
+    parser.add_argument(
+        "--warm-up",
+        type=int,
+        default=1,
+        required=False,
+        metavar="INTEGER",
+        help="Number of passes of the detection model on dummy input before processing, 0 to disable. (default: 1)",
+    )
+    parser.add_argument(
+        "--tiled",
+        default=False,
+        required=False,
+        metavar="TILED",
+        action=argparse.BooleanOptionalAction,
+        help="Set to detect objects also in overlapping tiles of the frame, improves detection of small objects in large frames.",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        required=False,
+        metavar="INTEGER",
+        help="Size of square tiles in pixels of the frame. (require '--tiled', default: Input size of the model)",
+    )
+    parser.add_argument(
+        "--tile-overlap",
+        type=float,
+        default=0.2,
+        required=False,
+        metavar="FLOAT",
+        help="Overlap of neighbouring tiles as a fraction of the tile size. (require '--tiled', default: 0.2)",
+    )
+    parser.add_argument(
+        "--adaptive-tiles",
+        default=False,
+        required=False,
+        metavar="ADAPTIVE",
+        action=argparse.BooleanOptionalAction,
+        help="Set to detect objects only in tiles overlapping objects found in the whole frame. (require '--tiled')",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        required=False,
+        metavar="INTEGER",
+        help="Number of frames passed through the detector at once. (default: 1)",
+    )
+    parser.add_argument(
+        "--detect-every",
+        type=int,
+        default=1,
+        required=False,
+        metavar="INTEGER",
+        help="Run detection only on every N-th frame, objects on other frames are predicted by the tracker. (require '-t', default: 1)",
+    )
+    parser.add_argument(
+        "--nn-budget",
+        type=int,
+        default=100,
+        required=False,
+        metavar="INTEGER",
+        help="Maximum number of appearance features kept for each tracked object, 0 for unlimited. (require '-t', default: 100)",
+    )
+    parser.add_argument(
+        "--motion",
+        default=False,
+        required=False,
+        metavar="MOTION",
+        action=argparse.BooleanOptionalAction,
+        help="Set to skip analysis of frames without motion, objects of the last analyzed frame are kept.",
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=0.002,
+        required=False,
+        metavar="FLOAT",
+        help="Minimum fraction of changed pixels considered as motion. (require '--motion', default: 0.002)",
+    )
+    parser.add_argument(
+        "--motion-refresh",
+        type=int,
+        default=50,
+        required=False,
+        metavar="INTEGER",
+        help="Maximum number of consecutive skipped frames, the next frame is always analyzed. (require '--motion', default: 50)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        default=False,
+        required=False,
+        metavar="PIPELINE",
+        action=argparse.BooleanOptionalAction,
+        help="Set to decode, analyze and encode frames concurrently in separate stages.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8,
+        required=False,
+        metavar="INTEGER",
+        help="Maximum number of batches of frames waiting between two pipeline stages. (require '--pipeline', default: 8)",
+    )
+    parser.add_argument(
+        "--profile",
+        default=False,
+        required=False,
+        metavar="PROFILE",
+        action=argparse.BooleanOptionalAction,
+        help="Set to measure duration of processing stages, the results are stored into '<output>.profile.json'.",
+    )
+
+    parser = parser.parse_args(argv)
 
     # Check if input video file exists.
     if os.path.exists(parser.input) == False:
         sys.stderr.write("The input video file does not exist.\n")
         exit(1)
 
+    # Pretrained weights of the selected model
+    if parser.weights == None:
+        parser.weights = MODELS[parser.model]["weights"]
+
     # Check if file with weights exists.
     if os.path.exists(parser.weights) == False:
-        sys.stderr.write("File with YOLOv3 weights does not exist.\n")
+        sys.stderr.write("File with weights of the model does not exist.\n")
         exit(1)
 
     # Validity check of output path.
@@ -169,6 +363,83 @@ def argumentParser():
         sys.stderr.write("Specified output path does not exist.\n")
         exit(1)
 
+    # Check number of frames in a batch.
+    if parser.batch_size < 1:
+        sys.stderr.write("Batch size must be a positive number.\n")
+        exit(1)
+
+    # Check interval between recognitions of tracked persons.
+    if parser.recognition_interval < 1:
+        sys.stderr.write("Recognition interval must be a positive number.\n")
+        exit(1)
+
+    # Check face distance which locks the identity of tracked persons.
+    if parser.recognition_lock < 0:
+        sys.stderr.write("Recognition lock distance must not be negative.\n")
+        exit(1)
+
+    # Check interval between detection frames.
+    if parser.detect_every < 1:
+        sys.stderr.write(
+            "Interval between detection frames must be a positive number.\n"
+        )
+        exit(1)
+
+    # Check number of appearance features kept for each tracked object.
+    if parser.nn_budget < 0:
+        sys.stderr.write("Budget of appearance features must not be negative.\n")
+        exit(1)
+
+    # Check margin of the region of interest.
+    if parser.roi_margin < 0:
+        sys.stderr.write("Margin of the region of interest must not be negative.\n")
+        exit(1)
+
+    # Check number of threads of the detection backend.
+    if parser.threads < 0:
+        sys.stderr.write("Number of threads must not be negative.\n")
+        exit(1)
+
+    # Check precision supported by the detection backend.
+    if parser.precision == "fp16" and parser.backend != "openvino":
+        sys.stderr.write("Precision fp16 is supported only by the openvino backend.\n")
+        exit(1)
+
+    if parser.precision == "int8" and parser.backend == "opencv":
+        sys.stderr.write("Precision int8 is not supported by the opencv backend.\n")
+        exit(1)
+
+    # Check number of warm-up passes.
+    if parser.warm_up < 0:
+        sys.stderr.write("Number of warm-up passes must not be negative.\n")
+        exit(1)
+
+    # Check parameters of tiles, tiles are not scaled by the network by default.
+    if parser.tile_size == None:
+        parser.tile_size = MODELS[parser.model]["inputShape"]
+
+    if parser.tile_size < 32:
+        sys.stderr.write("Size of tiles must be at least 32 pixels.\n")
+        exit(1)
+
+    if parser.tile_overlap < 0 or parser.tile_overlap >= 1:
+        sys.stderr.write("Overlap of tiles must be at least 0 and less than 1.\n")
+        exit(1)
+
+    # Check parameters of motion detection.
+    if parser.motion_threshold < 0 or parser.motion_threshold > 1:
+        sys.stderr.write("Motion threshold must be between 0 and 1.\n")
+        exit(1)
+
+    if parser.motion_refresh < 0:
+        sys.stderr.write("Number of skipped frames must not be negative.\n")
+        exit(1)
+
+    # Check size of queues between pipeline stages.
+    if parser.queue_size < 1:
+        sys.stderr.write("Size of pipeline queues must be a positive number.\n")
+        exit(1)
+
     # Path for the output video file.
     parser.output = os.path.join(parser.output, parser.name)
 
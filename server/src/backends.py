@@ -0,0 +1,176 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import sys
+import cv2
+
+from darknetOnnx import convertDarknet, quantizedModel
+
+
+class OpenCVBackend:
+    """
+    Class runs the Darknet network or ONNX model by OpenCV dnn module, only in full precision.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+    threads: Number of threads, default of the backend is used if 0.
+    precision: Precision of the computation: fp32, fp16 or int8 (see the backends).
+    """
+
+    def __init__(self, config, weights, threads, precision="fp32"):
+        self.threads = threads
+
+        if config == None:
+            self.model = cv2.dnn.readNetFromONNX(weights)
+        else:
+            self.model = cv2.dnn.readNetFromDarknet(config, weights)
+
+        # FIXME: Uncomment for GPU acceleration with OpenCV support
+        # self.model.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+        # self.model.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+
+        # Names of output layers are resolved only once
+        self.outputLayersNames = self.model.getUnconnectedOutLayersNames()
+        self.preparedBatchSizes = set()  # Batch sizes for which the network was run
+
+    def forward(self, blob):
+        """
+        Function passes the blob through the network.
+
+        Parameters:
+        blob: Input images in NCHW format.
+
+        Returns:
+        outputs: Outputs of YOLO layers.
+        """
+
+        # Number of threads of OpenCV is global and cached networks with different
+        # threads share the process, so it is set for each call (negative resets it)
+        cv2.setNumThreads(self.threads if self.threads > 0 else -1)
+        self.model.setInput(blob)
+        return self.model.forward(self.outputLayersNames)
+
+
+class OnnxRuntimeBackend:
+    """
+    Class runs the ONNX model (converted from Darknet) by ONNX Runtime on CPU.
+    Quantized INT8 model is used in int8 precision.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+    threads: Number of threads, default of the backend is used if 0.
+    precision: Precision of the computation: fp32, fp16 or int8 (see the backends).
+    """
+
+    def __init__(self, config, weights, threads, precision="fp32"):
+        try:
+            import onnxruntime
+        except ImportError:
+            sys.stderr.write("ONNX Runtime backend requires the onnxruntime package.\n")
+            exit(1)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        path = convertDarknet(config, weights)
+        if precision == "int8":
+            path = quantizedModel(config, weights)
+
+        self.session = onnxruntime.InferenceSession(
+            path,
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.inputName = self.session.get_inputs()[0].name
+        self.preparedBatchSizes = set()  # Batch sizes for which the network was run
+
+    def forward(self, blob):
+        """
+        Function passes the blob through the network.
+
+        Parameters:
+        blob: Input images in NCHW format.
+
+        Returns:
+        outputs: Outputs of YOLO layers.
+        """
+
+        return self.session.run(None, {self.inputName: blob})
+
+
+class OpenVINOBackend:
+    """
+    Class runs the ONNX model (converted from Darknet) by OpenVINO on CPU.
+    Quantized INT8 model is used in int8 precision, fp16 precision requires CPU support.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+    threads: Number of threads, default of the backend is used if 0.
+    precision: Precision of the computation: fp32, fp16 or int8 (see the backends).
+    """
+
+    def __init__(self, config, weights, threads, precision="fp32"):
+        try:
+            import openvino
+        except ImportError:
+            sys.stderr.write("OpenVINO backend requires the openvino package.\n")
+            exit(1)
+
+        # Core was moved from openvino.runtime in newer versions
+        if hasattr(openvino, "Core"):
+            core = openvino.Core()
+        else:
+            from openvino.runtime import Core
+
+            core = Core()
+
+        # Precision must be set explicitly, CPUs with BF16 support use it by default
+        if precision == "fp16":
+            if "FP16" not in core.get_property("CPU", "OPTIMIZATION_CAPABILITIES"):
+                sys.stderr.write("The CPU does not support fp16 precision.\n")
+                exit(1)
+            core.set_property("CPU", {"INFERENCE_PRECISION_HINT": "f16"})
+        else:
+            core.set_property("CPU", {"INFERENCE_PRECISION_HINT": "f32"})
+
+        if threads > 0:
+            core.set_property("CPU", {"INFERENCE_NUM_THREADS": threads})
+
+        path = convertDarknet(config, weights)
+        if precision == "int8":
+            path = quantizedModel(config, weights)
+
+        model = core.read_model(path)
+        self.model = core.compile_model(model, "CPU")
+        self.request = self.model.create_infer_request()
+        self.preparedBatchSizes = set()  # Batch sizes for which the network was run
+
+    def forward(self, blob):
+        """
+        Function passes the blob through the network.
+
+        Parameters:
+        blob: Input images in NCHW format.
+
+        Returns:
+        outputs: Outputs of YOLO layers.
+        """
+
+        self.request.infer({0: blob})
+        return [
+            self.request.get_output_tensor(i).data.copy()
+            for i in range(len(self.model.outputs))
+        ]
+
+
+# Backends selectable by name
+BACKENDS = {
+    "opencv": OpenCVBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+}
@@ -0,0 +1,329 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+# Benchmarked configurations, arguments are passed to main.py
+CONFIGS = {
+    "detector": ["-m", "yolo320"],
+    "tracking": ["-m", "yolo320", "-t"],
+    "recognition": ["-m", "yolo320", "-t", "-r"],
+    "yolo608": ["-m", "yolo608"],
+}
+
+samplesDir = os.path.join("..", "..", "samples")
+goldenDir = os.path.join("..", "benchmark", "golden")
+
+
+def runCase(sample, config, extraArgs, outputDir):
+    """
+    Function processes one sample video with one configuration in a separate process.
+
+    Parameters:
+    sample: Path to the sample video.
+    config: Name of the configuration, see CONFIGS.
+    extraArgs: Additional arguments of main.py common for all cases.
+    outputDir: Directory for the output video, summary and profile.
+
+    Returns:
+    result: Wall time, peak RSS, profile and summary of the processing.
+    """
+
+    name = os.path.splitext(os.path.basename(sample))[0] + "_" + config
+    command = [sys.executable, "main.py", "-i", sample, "-n", name, "-o", outputDir]
+    command += CONFIGS[config] + extraArgs + ["--profile"]
+
+    # Errors are collected in a file, a full pipe would block the process
+    with tempfile.TemporaryFile("w+") as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=errors)
+        # Resource usage of this child only, a new process starts with a fresh peak RSS
+        peakRSS = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            code = os.waitstatus_to_exitcode(status)
+            peakRSS = usage.ru_maxrss * 1024  # Kilobytes on Linux
+        else:
+            # Peak RSS is not available on Windows
+            code = process.wait()
+        wallTime = time.perf_counter() - start
+
+        if code != 0:
+            errors.seek(0)
+            sys.stderr.write(errors.read())
+            return {"sample": os.path.basename(sample), "config": config, "code": code}
+
+    output = os.path.join(outputDir, name)
+    with open(output + ".profile.json") as f:
+        profile = json.load(f)
+    with open(output + ".json") as f:
+        summary = json.load(f)
+
+    return {
+        "sample": os.path.basename(sample),
+        "config": config,
+        "code": code,
+        "seconds": round(wallTime, 3),
+        "fps": profile["fps"],
+        "peakRSS": peakRSS,
+        "stages": profile["stages"],
+        "summary": summary,
+    }
+
+
+def formatRSS(peakRSS):
+    """
+    Function formats peak RSS in mebibytes.
+
+    Parameters:
+    peakRSS: Peak RSS in bytes or None if it was not measured.
+
+    Returns:
+    text: Formatted peak RSS.
+    """
+
+    return "n/a" if peakRSS == None else f"{peakRSS / 2**20:.0f} MiB"
+
+
+def checkGolden(result, golden, update):
+    """
+    Function compares the summary of a case with the stored golden summary.
+
+    Parameters:
+    result: Result of the case, see runCase.
+    golden: Directory with golden summaries.
+    update: Set to store the summary as the new golden summary.
+
+    Returns:
+    status: "match", "mismatch", "missing" or "updated".
+    """
+
+    path = os.path.join(
+        golden, os.path.splitext(result["sample"])[0] + "_" + result["config"] + ".json"
+    )
+
+    if update == True:
+        os.makedirs(golden, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(json.dumps(result["summary"], indent=2))
+        return "updated"
+
+    if os.path.exists(path) == False:
+        return "missing"
+
+    with open(path) as f:
+        return "match" if json.load(f) == result["summary"] else "mismatch"
+
+
+def run(args):
+    """
+    Function runs all cases and stores their results.
+
+    Parameters:
+    args: Arguments of the run command.
+
+    Returns:
+    code: 0 if all cases succeeded and match golden summaries, otherwise 1.
+    """
+
+    samples = args.samples
+    if samples == None:
+        samples = sorted(
+            os.path.join(samplesDir, f)
+            for f in os.listdir(samplesDir)
+            if f.endswith(".mp4")
+        )
+
+    code = 0
+    results = []
+    with tempfile.TemporaryDirectory() as outputDir:
+        for sample in samples:
+            for config in args.configs:
+                result = runCase(sample, config, args.args, outputDir)
+                if result["code"] != 0:
+                    print(f"{result['sample']} {config}: failed with {result['code']}")
+                    code = 1
+                    continue
+
+                result["golden"] = checkGolden(result, args.golden, args.update_golden)
+                # Output without golden summary cannot be checked, it fails the run
+                if result["golden"] in ["mismatch", "missing"]:
+                    code = 1
+
+                print(
+                    f"{result['sample']} {config}: {result['fps']:.2f} FPS, "
+                    f"{result['seconds']:.1f} s, peak RSS {formatRSS(result['peakRSS'])}, "
+                    f"golden {result['golden']}"
+                )
+                del result["summary"]
+                results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "args": args.args,
+        "results": results,
+    }
+    with open(args.results, "w") as f:
+        f.write(json.dumps(report, indent=2))
+
+    if any(result["golden"] == "missing" for result in results):
+        sys.stderr.write(
+            f"Golden summaries are missing in {args.golden}, "
+            "create them by running with --update-golden on a reference build.\n"
+        )
+
+    return code
+
+
+def compare(args):
+    """
+    Function compares FPS and stage durations of two runs.
+
+    Parameters:
+    args: Arguments of the compare command.
+
+    Returns:
+    code: 1 if FPS of some case dropped by more than the threshold, otherwise 0.
+    """
+
+    with open(args.base) as f:
+        base = {(r["sample"], r["config"]): r for r in json.load(f)["results"]}
+    with open(args.new) as f:
+        new = {(r["sample"], r["config"]): r for r in json.load(f)["results"]}
+
+    code = 0
+    for key in sorted(base.keys() & new.keys()):
+        old, cur = base[key], new[key]
+        change = cur["fps"] / old["fps"] - 1 if old["fps"] > 0 else 0
+        regression = change < -args.threshold
+        code = 1 if regression == True else code
+
+        print(
+            f"{key[0]} {key[1]}: {old['fps']:.2f} -> {cur['fps']:.2f} FPS ({change:+.1%})"
+            f"{' REGRESSION' if regression == True else ''}, "
+            f"peak RSS {formatRSS(old['peakRSS'])} -> {formatRSS(cur['peakRSS'])}"
+        )
+
+        for stage in sorted(old["stages"].keys() | cur["stages"].keys()):
+            before = old["stages"].get(stage, {"mean": 0, "p95": 0})
+            after = cur["stages"].get(stage, {"mean": 0, "p95": 0})
+            print(
+                f"  {stage:<16} mean {before['mean']:9.3f} -> {after['mean']:9.3f} ms, "
+                f"p95 {before['p95']:9.3f} -> {after['p95']:9.3f} ms"
+            )
+
+    for key in sorted(base.keys() ^ new.keys()):
+        print(f"{key[0]} {key[1]}: only in {'base' if key in base else 'new'} run")
+
+    return code
+
+
+def argumentParser(argv=None):
+    """
+    Function parses arguments of the benchmark.
+
+    Returns:
+    args: Parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark of video processing over sample videos."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="Runs the benchmark.")
+    runParser.add_argument(
+        "--samples",
+        nargs="+",
+        required=False,
+        metavar="PATH",
+        help="Sample videos. (default: all videos in the samples directory)",
+    )
+    runParser.add_argument(
+        "--configs",
+        nargs="+",
+        default=list(CONFIGS.keys()),
+        choices=list(CONFIGS.keys()),
+        required=False,
+        metavar="CONFIG",
+        help="Benchmarked configurations: "
+        + ", ".join(CONFIGS.keys())
+        + ". (default: all)",
+    )
+    runParser.add_argument(
+        "--results",
+        default="benchmark.json",
+        required=False,
+        metavar="PATH",
+        help="Path to the file with results. (default: benchmark.json)",
+    )
+    runParser.add_argument(
+        "--golden",
+        default=goldenDir,
+        required=False,
+        metavar="PATH",
+        help="Directory with golden summaries of outputs. (default: server/benchmark/golden)",
+    )
+    runParser.add_argument(
+        "--update-golden",
+        default=False,
+        required=False,
+        metavar="UPDATE",
+        action=argparse.BooleanOptionalAction,
+        help="Set to store summaries of outputs as the new golden summaries.",
+    )
+    runParser.add_argument(
+        "--args",
+        nargs=argparse.REMAINDER,
+        default=[],
+        required=False,
+        metavar="ARGS",
+        help="Additional arguments passed to main.py in all cases (e.g. --args --batch-size 4).",
+    )
+
+    compareParser = commands.add_parser("compare", help="Compares results of two runs.")
+    compareParser.add_argument("base", metavar="BASE", help="Results of the base run.")
+    compareParser.add_argument("new", metavar="NEW", help="Results of the new run.")
+    compareParser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        required=False,
+        metavar="FLOAT",
+        help="Relative drop of FPS reported as a regression. (default: 0.05)",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Benchmark runs main.py with the given configurations over sample videos, each case in
+    a separate process. For every case it reports FPS, durations of stages, peak RSS and
+    whether the summary of the output matches the golden summary. Results of two runs
+    can be compared to find regressions.
+    """
+
+    args = argumentParser()
+
+    if args.command == "run":
+        exit(run(args))
+    else:
+        exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
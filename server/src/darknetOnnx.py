@@ -0,0 +1,381 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import os
+import sys
+import numpy as np
+
+
+def parseConfig(config):
+    """
+    Function parses Darknet configuration of the network.
+
+    Parameters:
+    config: Path to the configuration file.
+
+    Returns:
+    sections: List of sections, each section is a dictionary with its type and options.
+    """
+
+    sections = []
+    with open(config) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if line == "":
+                continue
+
+            if line.startswith("["):
+                sections.append({"type": line.strip("[]")})
+            else:
+                key, value = line.split("=", 1)
+                sections[-1][key.strip()] = value.strip()
+
+    return sections
+
+
+def readWeights(weights):
+    """
+    Function reads all weights of the network from Darknet weights file.
+
+    Parameters:
+    weights: Path to the weights file.
+
+    Returns:
+    values: Array with weights of all layers in order of the file.
+    """
+
+    with open(weights, "rb") as f:
+        major, minor, _ = np.fromfile(f, dtype=np.int32, count=3)
+        # Number of seen images is stored as 64-bit integer since version 0.2
+        np.fromfile(f, dtype=np.int64 if major * 10 + minor >= 2 else np.int32, count=1)
+        return np.fromfile(f, dtype=np.float32)
+
+
+def buildModel(config, weights):
+    """
+    Function builds ONNX model of the YOLOv3 network. Outputs of YOLO layers have the same
+    format as outputs of OpenCV dnn module, one row [cx, cy, w, h, objectness, scores...]
+    per anchor box, so the detector processes outputs of both the same way.
+
+    Parameters:
+    config: Path to the Darknet configuration file.
+    weights: Path to the Darknet weights file.
+
+    Returns:
+    model: ONNX model with dynamic batch size.
+    """
+
+    from onnx import helper, numpy_helper, TensorProto
+
+    sections = parseConfig(config)
+    net, layers = sections[0], sections[1:]
+    inputWidth, inputHeight = int(net["width"]), int(net["height"])
+    values = readWeights(weights)
+
+    nodes = []
+    initializers = []
+    outputs = []
+    offset = 0
+
+    def constant(name, value):
+        initializers.append(numpy_helper.from_array(np.asarray(value), name))
+        return name
+
+    def node(opType, inputs, name, **attributes):
+        nodes.append(helper.make_node(opType, inputs, [name], name=name, **attributes))
+        return name
+
+    def take(count):
+        nonlocal offset
+        taken = values[offset : offset + count]
+        offset += count
+        return taken
+
+    # Output name, channels and size of each layer
+    names, channels, sizes = [], [], []
+    previous, previousChannels, size = "input", int(net["channels"]), inputHeight
+
+    for i, layer in enumerate(layers):
+        name = f"layer{i}"
+
+        if layer["type"] == "convolutional":
+            filters = int(layer["filters"])
+            kernel = int(layer["size"])
+            stride = int(layer["stride"])
+            padding = kernel // 2 if int(layer.get("pad", 0)) == 1 else 0
+
+            # Batch normalization is folded into weights and biases of the convolution
+            if int(layer.get("batch_normalize", 0)) == 1:
+                beta, gamma, mean, variance = (take(filters) for _ in range(4))
+                scale = gamma / np.sqrt(variance + 0.00001)
+                bias = beta - mean * scale
+            else:
+                scale, bias = np.ones(filters, dtype=np.float32), take(filters)
+
+            weight = take(filters * previousChannels * kernel * kernel)
+            weight = weight.reshape(filters, previousChannels, kernel, kernel)
+            weight = weight * scale[:, None, None, None]
+
+            node(
+                "Conv",
+                [
+                    previous,
+                    constant(name + ".weight", weight.astype(np.float32)),
+                    constant(name + ".bias", bias.astype(np.float32)),
+                ],
+                name + ".conv" if layer["activation"] == "leaky" else name,
+                kernel_shape=[kernel, kernel],
+                strides=[stride, stride],
+                pads=[padding] * 4,
+            )
+            if layer["activation"] == "leaky":
+                node("LeakyRelu", [name + ".conv"], name, alpha=0.1)
+
+            previousChannels = filters
+            size = (size + 2 * padding - kernel) // stride + 1
+
+        elif layer["type"] == "shortcut":
+            source = i + int(layer["from"])
+            node("Add", [previous, names[source]], name)
+
+        elif layer["type"] == "route":
+            sources = [int(l) for l in layer["layers"].split(",")]
+            sources = [i + s if s < 0 else s for s in sources]
+            if len(sources) == 1:
+                name = names[sources[0]]
+            else:
+                node("Concat", [names[s] for s in sources], name, axis=1)
+            previousChannels = sum(channels[s] for s in sources)
+            size = sizes[sources[0]]
+
+        elif layer["type"] == "maxpool":
+            kernel = int(layer["size"])
+            stride = int(layer["stride"])
+
+            # Darknet pads by size - 1 in total, the smaller half at the beginning
+            padding = int(layer.get("padding", kernel - 1))
+            node(
+                "MaxPool",
+                [previous],
+                name,
+                kernel_shape=[kernel, kernel],
+                strides=[stride, stride],
+                pads=[padding // 2] * 2 + [padding - padding // 2] * 2,
+            )
+            size = (size + padding - kernel) // stride + 1
+
+        elif layer["type"] == "upsample":
+            stride = int(layer["stride"])
+            node(
+                "Resize",
+                [
+                    previous,
+                    "",
+                    constant(
+                        name + ".scales", np.array([1, 1, stride, stride], np.float32)
+                    ),
+                ],
+                name,
+                mode="nearest",
+            )
+            size *= stride
+
+        elif layer["type"] == "yolo":
+            mask = [int(m) for m in layer["mask"].split(",")]
+            anchors = np.array([float(a) for a in layer["anchors"].split(",")])
+            anchors = anchors.reshape(-1, 2)[mask]
+            classes = int(layer["classes"])
+            count = len(mask)
+
+            # (N, anchors * (5 + classes), H, W) => (N, H, W, anchors, 5 + classes)
+            shape = [-1, count, 5 + classes, size, size]
+            node("Reshape", [previous, constant(name + ".shape", shape)], name + ".5d")
+            node("Transpose", [name + ".5d"], name + ".nhwc", perm=[0, 3, 4, 1, 2])
+
+            def part(suffix, start, end):
+                return node(
+                    "Slice",
+                    [
+                        name + ".nhwc",
+                        constant(name + f".{suffix}.start", [start]),
+                        constant(name + f".{suffix}.end", [end]),
+                        constant(name + f".{suffix}.axes", [4]),
+                    ],
+                    name + f".{suffix}",
+                )
+
+            # Centers relative to the frame, grid cell offset plus predicted position
+            grid = np.stack(np.meshgrid(np.arange(size), np.arange(size)), axis=-1)
+            grid = grid.reshape(1, size, size, 1, 2).astype(np.float32)
+            node("Sigmoid", [part("xy", 0, 2)], name + ".xy.sigmoid")
+            node(
+                "Add",
+                [name + ".xy.sigmoid", constant(name + ".grid", grid)],
+                name + ".xy.cell",
+            )
+            node(
+                "Div",
+                [name + ".xy.cell", constant(name + ".size", np.float32(size))],
+                name + ".xy.out",
+            )
+
+            # Dimensions relative to the frame, scaled anchor sizes
+            anchors = anchors / np.array([inputWidth, inputHeight])
+            anchors = anchors.reshape(1, 1, 1, count, 2).astype(np.float32)
+            node("Exp", [part("wh", 2, 4)], name + ".wh.exp")
+            node(
+                "Mul",
+                [name + ".wh.exp", constant(name + ".anchors", anchors)],
+                name + ".wh.out",
+            )
+
+            # Class scores are conditioned by the objectness
+            objectness = node("Sigmoid", [part("obj", 4, 5)], name + ".obj.out")
+            node("Sigmoid", [part("cls", 5, 5 + classes)], name + ".cls.sigmoid")
+            node("Mul", [name + ".cls.sigmoid", objectness], name + ".cls.out")
+
+            node(
+                "Concat",
+                [name + ".xy.out", name + ".wh.out", objectness, name + ".cls.out"],
+                name + ".rows",
+                axis=4,
+            )
+            node(
+                "Reshape",
+                [name + ".rows", constant(name + ".outShape", [-1, 5 + classes])],
+                name,
+            )
+            outputs.append(
+                helper.make_tensor_value_info(
+                    name, TensorProto.FLOAT, [None, 5 + classes]
+                )
+            )
+
+        else:
+            sys.stderr.write(f"Unsupported layer of the network: {layer['type']}.\n")
+            exit(1)
+
+        names.append(name)
+        channels.append(previousChannels)
+        sizes.append(size)
+        previous = name
+
+    if offset != values.size:
+        sys.stderr.write("Weights do not match the configuration of the network.\n")
+        exit(1)
+
+    graph = helper.make_graph(
+        nodes,
+        "yolov3",
+        [
+            helper.make_tensor_value_info(
+                "input",
+                TensorProto.FLOAT,
+                ["batch", int(net["channels"]), inputHeight, inputWidth],
+            )
+        ],
+        outputs,
+        initializers,
+    )
+
+    # IR version 7 of opset 13 is supported also by older runtimes
+    return helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=7
+    )
+
+
+def modelPath(config, weights, precision="fp32"):
+    """
+    Function returns path to the ONNX model of the network, models are stored next to the weights.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+    precision: Precision of the model, fp32 for the converted model or int8 for the quantized model.
+
+    Returns:
+    path: Path to the ONNX model.
+    """
+
+    suffix = "" if precision == "fp32" else f".{precision}"
+
+    # Models already in ONNX format
+    if config == None:
+        if precision == "fp32":
+            return weights
+        return f"{os.path.splitext(weights)[0]}{suffix}.onnx"
+
+    configName = os.path.splitext(os.path.basename(config))[0]
+    return f"{weights}.{configName}{suffix}.onnx"
+
+
+def quantizedModel(config, weights):
+    """
+    Function returns path to the INT8 model of the network created by quantize.py.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+
+    Returns:
+    path: Path to the quantized ONNX model.
+    """
+
+    path = modelPath(config, weights, "int8")
+
+    if os.path.exists(path) == False:
+        sys.stderr.write("Quantized model does not exist, create it by quantize.py.\n")
+        exit(1)
+
+    sources = [weights] if config == None else [config, weights]
+    if os.path.getmtime(path) < max(os.path.getmtime(source) for source in sources):
+        sys.stderr.write(
+            "Quantized model is outdated, create it again by quantize.py.\n"
+        )
+        exit(1)
+
+    return path
+
+
+def convertDarknet(config, weights):
+    """
+    Function converts Darknet network to ONNX model. The model is stored next to the weights
+    and converted again only if the configuration or the weights change.
+
+    Parameters:
+    config: Path to the Darknet configuration file, None for ONNX models.
+    weights: Path to the Darknet weights file or to the ONNX model.
+
+    Returns:
+    path: Path to the ONNX model.
+    """
+
+    # Model is already in ONNX format
+    if config == None:
+        return weights
+
+    path = modelPath(config, weights)
+
+    if os.path.exists(path) and os.path.getmtime(path) >= max(
+        os.path.getmtime(config), os.path.getmtime(weights)
+    ):
+        return path
+
+    try:
+        import onnx
+    except ImportError:
+        sys.stderr.write("Conversion of the network requires the onnx package.\n")
+        exit(1)
+
+    print(f"Converting {weights} to ONNX model")
+    model = buildModel(config, weights)
+
+    # Other workers may convert the same weights at the same time
+    temporary = f"{path}.{os.getpid()}"
+    onnx.save(model, temporary)
+    os.replace(temporary, path)
+
+    return path
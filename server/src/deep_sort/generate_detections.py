@@ -32,7 +32,7 @@ def _run_in_batches(f, data_dict, out, batch_size):
         out[e:] = f(batch_data_dict)
 
 
-def extract_image_patch(image, bbox, patch_shape):
+def extract_image_patch(image, bbox, patch_shape, out=None):
     """Extract image patch from bounding box.
 
     Parameters
@@ -46,6 +46,9 @@ def extract_image_patch(image, bbox, patch_shape):
         (height, width). First, the `bbox` is adapted to the aspect ratio
         of the patch shape, then it is clipped at the image boundaries.
         If None, the shape is computed from :arg:`bbox`.
+    out : Optional[ndarray]
+        Preallocated array of shape :arg:`patch_shape` the patch is resized
+        into. If None, a new array is allocated.
 
     Returns
     -------
@@ -75,7 +78,7 @@ def extract_image_patch(image, bbox, patch_shape):
         return None
     sx, sy, ex, ey = bbox
     image = image[sy:ey, sx:ex]
-    image = cv2.resize(image, tuple(patch_shape[::-1]))
+    image = cv2.resize(image, tuple(patch_shape[::-1]), dst=out)
     return image
 
 
@@ -111,24 +114,104 @@ class ImageEncoder(object):
         return out
 
 
+class BoxEncoder(object):
+    """
+    Computes appearance features of image patches given by bounding boxes.
+    Patches of all boxes are extracted into one preallocated buffer and
+    encoded together in as few session runs as the batch size allows.
+
+    Parameters
+    ----------
+    image_encoder : ImageEncoder
+        The encoder of image patches.
+    batch_size : int
+        Maximum number of patches in a single session run.
+    swap_rb : bool
+        If True, channels of the extracted patches are reversed, so that
+        the encoder receives RGB patches of BGR images without converting
+        the full images.
+
+    """
+
+    def __init__(self, image_encoder, batch_size=32, swap_rb=False):
+        self.image_encoder = image_encoder
+        self.image_shape = image_encoder.image_shape
+        self.batch_size = batch_size
+        self.swap_rb = swap_rb
+        self._patches = np.empty([0] + self.image_shape, np.uint8)
+
+    def _extract_patches(self, images, boxes_list):
+        count = sum(len(boxes) for boxes in boxes_list)
+        if len(self._patches) < count:
+            self._patches = np.empty([count] + self.image_shape, np.uint8)
+
+        patches = self._patches[:count]
+        i = 0
+        for image, boxes in zip(images, boxes_list):
+            for box in boxes:
+                patch = extract_image_patch(
+                    image, box, self.image_shape[:2], patches[i]
+                )
+                if patch is None:
+                    print("WARNING: Failed to extract image patch: %s." % str(box))
+                    patches[i] = np.random.uniform(0.0, 255.0, self.image_shape)
+                elif self.swap_rb:
+                    cv2.cvtColor(patches[i], cv2.COLOR_BGR2RGB, dst=patches[i])
+                i += 1
+        return patches
+
+    def __call__(self, image, boxes):
+        """Compute features of the bounding boxes in the image.
+
+        Parameters
+        ----------
+        image : ndarray
+            The full image.
+        boxes : array_like
+            Bounding boxes in format (x, y, width, height).
+
+        Returns
+        -------
+        ndarray
+            A matrix of corresponding feature vectors.
+
+        """
+        patches = self._extract_patches([image], [boxes])
+        return self.image_encoder(patches, self.batch_size)
+
+    def encode_batch(self, images, boxes_list):
+        """Compute features of the bounding boxes in several images at once.
+
+        Parameters
+        ----------
+        images : List[ndarray]
+            The full images.
+        boxes_list : List[array_like]
+            Bounding boxes for each image in format (x, y, width, height).
+
+        Returns
+        -------
+        List[ndarray]
+            A matrix of feature vectors for each image.
+
+        """
+        if len(images) == 0:
+            return []
+        patches = self._extract_patches(images, boxes_list)
+        features = self.image_encoder(patches, self.batch_size)
+        splits = np.cumsum([len(boxes) for boxes in boxes_list])[:-1]
+        return np.split(features, splits)
+
+
 def create_box_encoder(
-    model_filename, input_name="images", output_name="features", batch_size=32
+    model_filename,
+    input_name="images",
+    output_name="features",
+    batch_size=32,
+    swap_rb=False,
 ):
     image_encoder = ImageEncoder(model_filename, input_name, output_name)
-    image_shape = image_encoder.image_shape
-
-    def encoder(image, boxes):
-        image_patches = []
-        for box in boxes:
-            patch = extract_image_patch(image, box, image_shape[:2])
-            if patch is None:
-                print("WARNING: Failed to extract image patch: %s." % str(box))
-                patch = np.random.uniform(0.0, 255.0, image_shape).astype(np.uint8)
-            image_patches.append(patch)
-        image_patches = np.asarray(image_patches)
-        return image_encoder(image_patches, batch_size)
-
-    return encoder
+    return BoxEncoder(image_encoder, batch_size, swap_rb)
 
 
 def generate_detections(encoder, mot_dir, output_dir, detection_dir=None):
@@ -8,6 +8,10 @@ from __future__ import absolute_import
 import numpy as np
 from . import linear_assignment
 
+# Number of track and detection pairs from which `iou_cost` skips pairs of
+# boxes which cannot overlap (see `iou_matrix_sweep`).
+SWEEP_MIN_PAIRS = 160000
+
 
 def iou(bbox, candidates):
     """Computer intersection over union.
@@ -48,7 +52,81 @@ def iou(bbox, candidates):
     return area_intersection / (area_bbox + area_candidates - area_intersection)
 
 
-def iou_cost(tracks, detections, track_indices=None, detection_indices=None):
+def iou_matrix(bboxes, candidates):
+    """Compute intersection over union of all pairs of boxes at once.
+
+    Parameters
+    ----------
+    bboxes : ndarray
+        A matrix of N bounding boxes (one per row) in format
+        `(top left x, top left y, width, height)`.
+    candidates : ndarray
+        A matrix of M candidate bounding boxes (one per row) in the same format
+        as `bboxes`.
+
+    Returns
+    -------
+    ndarray
+        Returns an NxM matrix, where element (i, j) is the intersection over
+        union in [0, 1] between `bboxes[i]` and `candidates[j]`.
+
+    """
+    bboxes_tl = bboxes[:, np.newaxis, :2]
+    bboxes_br = bboxes_tl + bboxes[:, np.newaxis, 2:]
+    candidates_tl = candidates[np.newaxis, :, :2]
+    candidates_br = candidates_tl + candidates[np.newaxis, :, 2:]
+
+    wh = np.maximum(
+        0.0, np.minimum(bboxes_br, candidates_br) - np.maximum(bboxes_tl, candidates_tl)
+    )
+    area_intersection = wh.prod(axis=2)
+    area_bboxes = bboxes[:, 2:].prod(axis=1)[:, np.newaxis]
+    area_candidates = candidates[:, 2:].prod(axis=1)[np.newaxis, :]
+    return area_intersection / (area_bboxes + area_candidates - area_intersection)
+
+
+def iou_matrix_sweep(bboxes, candidates):
+    """Compute intersection over union of all pairs of boxes, skipping pairs
+    which cannot overlap. Candidates are sorted by their left edge, so that
+    each box is compared only with the window of candidates that start before
+    its right edge and not further to the left than the widest candidate.
+    This pays off when both sets of boxes are large and spread over the image.
+
+    Parameters
+    ----------
+    bboxes : ndarray
+        A matrix of N bounding boxes (one per row) in format
+        `(top left x, top left y, width, height)`.
+    candidates : ndarray
+        A matrix of M candidate bounding boxes (one per row) in the same format
+        as `bboxes`.
+
+    Returns
+    -------
+    ndarray
+        Returns an NxM matrix, where element (i, j) is the intersection over
+        union in [0, 1] between `bboxes[i]` and `candidates[j]`.
+
+    """
+    result = np.zeros((len(bboxes), len(candidates)))
+    if len(bboxes) == 0 or len(candidates) == 0:
+        return result
+
+    order = np.argsort(candidates[:, 0], kind="stable")
+    lefts = candidates[order, 0]
+    max_width = candidates[:, 2].max()
+    starts = np.searchsorted(lefts, bboxes[:, 0] - max_width, side="left")
+    ends = np.searchsorted(lefts, bboxes[:, 0] + bboxes[:, 2], side="left")
+
+    for row in np.flatnonzero(ends > starts):
+        window = order[starts[row] : ends[row]]
+        result[row, window] = iou_matrix(bboxes[row : row + 1], candidates[window])[0]
+    return result
+
+
+def iou_cost(
+    tracks, detections, track_indices=None, detection_indices=None, sweep=None
+):
     """An intersection over union distance metric.
 
     Parameters
@@ -63,6 +141,11 @@ def iou_cost(tracks, detections, track_indices=None, detection_indices=None):
     detection_indices : Optional[List[int]]
         A list of indices to detections that should be matched. Defaults
         to all `detections`.
+    sweep : Optional[bool]
+        If True, pairs of boxes which cannot overlap are skipped by a sweep
+        over candidates sorted along the x axis (see `iou_matrix_sweep`). If
+        None, the sweep is used when the number of pairs reaches
+        `SWEEP_MIN_PAIRS`.
 
     Returns
     -------
@@ -77,13 +160,24 @@ def iou_cost(tracks, detections, track_indices=None, detection_indices=None):
     if detection_indices is None:
         detection_indices = np.arange(len(detections))
 
-    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
-    for row, track_idx in enumerate(track_indices):
-        if tracks[track_idx].time_since_update > 1:
-            cost_matrix[row, :] = linear_assignment.INFTY_COST
-            continue
-
-        bbox = tracks[track_idx].to_tlwh()
-        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
-        cost_matrix[row, :] = 1.0 - iou(bbox, candidates)
+    cost_matrix = np.full(
+        (len(track_indices), len(detection_indices)), linear_assignment.INFTY_COST
+    )
+    rows = np.array(
+        [tracks[i].time_since_update <= 1 for i in track_indices], dtype=bool
+    )
+    if not rows.any() or len(detection_indices) == 0:
+        return cost_matrix
+
+    # Candidates are built once for all tracks.
+    bboxes = np.asarray([tracks[i].to_tlwh() for i in np.asarray(track_indices)[rows]])
+    candidates = np.asarray(
+        [detections[i].tlwh for i in detection_indices], dtype=float
+    )
+    if sweep is None:
+        sweep = len(bboxes) * len(candidates) >= SWEEP_MIN_PAIRS
+    if sweep:
+        cost_matrix[rows] = 1.0 - iou_matrix_sweep(bboxes, candidates)
+    else:
+        cost_matrix[rows] = 1.0 - iou_matrix(bboxes, candidates)
     return cost_matrix
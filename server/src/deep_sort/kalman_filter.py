@@ -133,6 +133,62 @@ class KalmanFilter(object):
 
         return mean, covariance
 
+    def predict_batch(self, mean, covariance):
+        """Run Kalman filter prediction step for several tracks at once.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional matrix of mean vectors of N object states at
+            the previous time step.
+        covariance : ndarray
+            The Nx8x8 dimensional array of covariance matrices of N object
+            states at the previous time step.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the mean vectors and covariance matrices of the predicted
+            states.
+
+        """
+        std = np.empty((len(mean), 8))
+        std[:, :4] = self._std_weight_position * mean[:, 3:4]
+        std[:, 4:] = self._std_weight_velocity * mean[:, 3:4]
+        std[:, 2] = 1e-2
+        std[:, 6] = 1e-5
+
+        mean = np.matmul(mean, self._motion_mat.T)
+        covariance = np.matmul(
+            np.matmul(self._motion_mat, covariance), self._motion_mat.T
+        )
+        diagonal = np.arange(8)
+        covariance[:, diagonal, diagonal] += np.square(std)
+
+        return mean, covariance
+
+    def extrapolate(self, mean, dt):
+        """Shift the mean of the state distribution by a (possibly fractional)
+        number of time steps according to the constant velocity model. The
+        covariance is not propagated.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The 8 dimensional mean vector of the object state.
+        dt : float
+            Number of time steps, e.g. 0.5 for the middle between two steps.
+
+        Returns
+        -------
+        ndarray
+            Returns the mean vector of the extrapolated state.
+
+        """
+        mean = mean.copy()
+        mean[:4] += dt * mean[4:]
+        return mean
+
     def project(self, mean, covariance):
         """Project state distribution to measurement space.
 
@@ -164,6 +220,35 @@ class KalmanFilter(object):
         )
         return mean, covariance + innovation_cov
 
+    def project_batch(self, mean, covariance):
+        """Project state distributions of several tracks to measurement space
+        at once.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional matrix of mean vectors of N states.
+        covariance : ndarray
+            The Nx8x8 dimensional array of covariance matrices of N states.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 dimensional projected means and Nx4x4 dimensional
+            projected covariance matrices of the given state estimates.
+
+        """
+        std = np.empty((len(mean), 4))
+        std[:] = self._std_weight_position * mean[:, 3:4]
+        std[:, 2] = 1e-1
+
+        # The observation matrix selects the first 4 state dimensions.
+        projected_mean = mean[:, :4]
+        projected_cov = covariance[:, :4, :4].copy()
+        diagonal = np.arange(4)
+        projected_cov[:, diagonal, diagonal] += np.square(std)
+        return projected_mean, projected_cov
+
     def update(self, mean, covariance, measurement):
         """Run Kalman filter correction step.
 
@@ -202,6 +287,41 @@ class KalmanFilter(object):
         )
         return new_mean, new_covariance
 
+    def update_batch(self, mean, covariance, measurement):
+        """Run Kalman filter correction step for several tracks at once.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional matrix of predicted mean vectors of N states.
+        covariance : ndarray
+            The Nx8x8 dimensional array of covariance matrices of N states.
+        measurement : ndarray
+            The Nx4 dimensional matrix of measurement vectors (x, y, a, h),
+            one for each state.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the measurement-corrected state distributions.
+
+        """
+        projected_mean, projected_cov = self.project_batch(mean, covariance)
+
+        # The observation matrix selects the first 4 state dimensions, so the
+        # product of the covariance and the transposed observation matrix is
+        # a slice of the covariance.
+        kalman_gain = np.linalg.solve(
+            projected_cov, covariance[:, :, :4].transpose(0, 2, 1)
+        ).transpose(0, 2, 1)
+        innovation = measurement - projected_mean
+
+        new_mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        new_covariance = covariance - np.matmul(
+            np.matmul(kalman_gain, projected_cov), kalman_gain.transpose(0, 2, 1)
+        )
+        return new_mean, new_covariance
+
     def gating_distance(self, mean, covariance, measurements, only_position=False):
         """Compute gating distance between state distribution and measurements.
 
@@ -243,3 +363,42 @@ class KalmanFilter(object):
         )
         squared_maha = np.sum(z * z, axis=0)
         return squared_maha
+
+    def gating_distance_batch(
+        self, mean, covariance, measurements, only_position=False
+    ):
+        """Compute gating distances between state distributions of several
+        tracks and measurements in one vectorized pass.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional matrix of mean vectors of N states.
+        covariance : ndarray
+            The Nx8x8 dimensional array of covariance matrices of N states.
+        measurements : ndarray
+            An Mx4 dimensional matrix of M measurements, each in
+            format (x, y, a, h) where (x, y) is the bounding box center
+            position, a the aspect ratio, and h the height.
+        only_position : Optional[bool]
+            If True, distance computation is done with respect to the bounding
+            box center position only.
+
+        Returns
+        -------
+        ndarray
+            Returns an NxM dimensional matrix, where element (i, j) contains
+            the squared Mahalanobis distance between the i-th state
+            distribution and `measurements[j]`.
+
+        """
+        mean, covariance = self.project_batch(mean, covariance)
+        if only_position:
+            mean, covariance = mean[:, :2], covariance[:, :2, :2]
+            measurements = measurements[:, :2]
+
+        cholesky_factor = np.linalg.cholesky(covariance)
+        d = measurements[np.newaxis, :, :] - mean[:, np.newaxis, :]
+        z = np.linalg.solve(cholesky_factor, d.transpose(0, 2, 1))
+        squared_maha = np.einsum("nkm,nkm->nm", z, z)
+        return squared_maha
@@ -11,11 +11,94 @@ from . import kalman_filter
 # Deprecated version - replaced with equivalent method from Scipy
 # from sklearn.utils.linear_assignment_ import linear_assignment
 from scipy.optimize import linear_sum_assignment as linear_assignment
-
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 INFTY_COST = 1e5
 
 
+# Above this number of feasible pairs per row or column, the bipartite graph
+# almost always forms a single component and splitting it only adds overhead.
+DENSE_PAIRS_PER_NODE = 4
+
+
+def _solve_components(cost_matrix, feasible):
+    """Solve linear assignment problem separately for each connected component
+    of the bipartite graph of feasible pairs. Rows and columns without any
+    feasible pair are skipped and components of a single pair are matched
+    directly. If the feasible pairs are dense, the graph is not split and the
+    matrix reduced to the remaining rows and columns is solved at once.
+    Infeasible pairs never lower the total cost of an assignment, so
+    the solution has the same cost as the solution of the whole matrix.
+
+    Parameters
+    ----------
+    cost_matrix : ndarray
+        The NxM dimensional cost matrix.
+    feasible : ndarray
+        The NxM dimensional boolean matrix of pairs that can be matched.
+
+    Returns
+    -------
+    (ndarray, ndarray)
+        Returns row and column indices of the matched feasible pairs, sorted
+        by rows like the result of `linear_assignment`.
+
+    """
+    rows = np.flatnonzero(feasible.any(axis=1))
+    cols = np.flatnonzero(feasible.any(axis=0))
+    if len(rows) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    sub_feasible = feasible[np.ix_(rows, cols)]
+    nodes = len(rows) + len(cols)
+    if np.count_nonzero(sub_feasible) > DENSE_PAIRS_PER_NODE * nodes:
+        r, c = linear_assignment(cost_matrix[np.ix_(rows, cols)])
+        r, c = rows[r], cols[c]
+        valid = feasible[r, c]
+        return r[valid], c[valid]
+
+    # Rows and columns are nodes of one graph, columns are numbered after rows.
+    edge_rows, edge_cols = np.nonzero(sub_feasible)
+    graph = coo_matrix(
+        (np.ones(len(edge_rows)), (edge_rows, len(rows) + edge_cols)),
+        shape=(nodes, nodes),
+    )
+    count, labels = connected_components(graph, directed=False)
+    row_labels, col_labels = labels[: len(rows)], labels[len(rows) :]
+
+    row_sizes = np.bincount(row_labels, minlength=count)
+    col_sizes = np.bincount(col_labels, minlength=count)
+
+    # Components of a single pair are matched directly.
+    single = np.flatnonzero((row_sizes == 1) & (col_sizes == 1))
+    row_of_label = np.empty(count, dtype=int)
+    row_of_label[row_labels] = rows
+    col_of_label = np.empty(count, dtype=int)
+    col_of_label[col_labels] = cols
+    matched_rows, matched_cols = [row_of_label[single]], [col_of_label[single]]
+
+    row_groups = np.split(
+        rows[np.argsort(row_labels, kind="stable")], np.cumsum(row_sizes)[:-1]
+    )
+    col_groups = np.split(
+        cols[np.argsort(col_labels, kind="stable")], np.cumsum(col_sizes)[:-1]
+    )
+    for label in np.flatnonzero((row_sizes > 1) | (col_sizes > 1)):
+        component_rows, component_cols = row_groups[label], col_groups[label]
+        r, c = linear_assignment(cost_matrix[np.ix_(component_rows, component_cols)])
+        r, c = component_rows[r], component_cols[c]
+        valid = feasible[r, c]
+        matched_rows.append(r[valid])
+        matched_cols.append(c[valid])
+
+    # Components are merged in the row order of a single solution.
+    matched_rows = np.concatenate(matched_rows)
+    matched_cols = np.concatenate(matched_cols)
+    order = np.argsort(matched_rows)
+    return matched_rows[order], matched_cols[order]
+
+
 def min_cost_matching(
     distance_metric,
     max_distance,
@@ -66,32 +149,46 @@ def min_cost_matching(
         return [], track_indices, detection_indices  # Nothing to match.
 
     cost_matrix = distance_metric(tracks, detections, track_indices, detection_indices)
-    cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
-    indices = linear_assignment(cost_matrix)
-
-    # Oprava staré verze sklearn knihovny.
-    indices = np.hstack(
-        [
-            indices[0].reshape(((indices[0].shape[0]), 1)),
-            indices[1].reshape(((indices[0].shape[0]), 1)),
-        ]
-    )
+    feasible = cost_matrix <= max_distance
+    cost_matrix[~feasible] = max_distance + 1e-5
+
+    # The order of unmatched indices decides the numbering of new tracks. The
+    # solution of the whole matrix lists unassigned indices first and then
+    # indices assigned to infeasible pairs, in an order given by the solver.
+    # Components give the same result only if no infeasible pair is assigned,
+    # i.e. if all rows or all columns are matched to feasible pairs.
+    size = min(cost_matrix.shape)
+    rows = None
+    if (
+        np.count_nonzero(feasible.any(axis=1)) >= size
+        and np.count_nonzero(feasible.any(axis=0)) >= size
+    ):
+        rows, cols = _solve_components(cost_matrix, feasible)
+        if len(rows) < size:
+            rows = None
+    if rows is None:
+        rows, cols = linear_assignment(cost_matrix)
+    valid = feasible[rows, cols]
 
-    matches, unmatched_tracks, unmatched_detections = [], [], []
-    for col, detection_idx in enumerate(detection_indices):
-        if col not in indices[:, 1]:
-            unmatched_detections.append(detection_idx)
-    for row, track_idx in enumerate(track_indices):
-        if row not in indices[:, 0]:
-            unmatched_tracks.append(track_idx)
-    for row, col in indices:
-        track_idx = track_indices[row]
-        detection_idx = detection_indices[col]
-        if cost_matrix[row, col] > max_distance:
-            unmatched_tracks.append(track_idx)
-            unmatched_detections.append(detection_idx)
-        else:
-            matches.append((track_idx, detection_idx))
+    track_indices = np.asarray(track_indices)
+    detection_indices = np.asarray(detection_indices)
+    unassigned_rows = np.ones(len(track_indices), dtype=bool)
+    unassigned_rows[rows] = False
+    unassigned_cols = np.ones(len(detection_indices), dtype=bool)
+    unassigned_cols[cols] = False
+
+    matches = list(
+        zip(
+            track_indices[rows[valid]].tolist(), detection_indices[cols[valid]].tolist()
+        )
+    )
+    unmatched_tracks = (
+        track_indices[unassigned_rows].tolist() + track_indices[rows[~valid]].tolist()
+    )
+    unmatched_detections = (
+        detection_indices[unassigned_cols].tolist()
+        + detection_indices[cols[~valid]].tolist()
+    )
     return matches, unmatched_tracks, unmatched_detections
 
 
@@ -217,10 +314,14 @@ def gate_cost_matrix(
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
     measurements = np.asarray([detections[i].to_xyah() for i in detection_indices])
-    for row, track_idx in enumerate(track_indices):
-        track = tracks[track_idx]
-        gating_distance = kf.gating_distance(
-            track.mean, track.covariance, measurements, only_position
-        )
-        cost_matrix[row, gating_distance > gating_threshold] = gated_cost
+    if len(track_indices) == 0 or len(measurements) == 0:
+        return cost_matrix
+
+    # Distances of all tracks are computed at once from stacked states.
+    means = np.asarray([tracks[i].mean for i in track_indices])
+    covariances = np.asarray([tracks[i].covariance for i in track_indices])
+    gating_distance = kf.gating_distance_batch(
+        means, covariances, measurements, only_position
+    )
+    cost_matrix[gating_distance > gating_threshold] = gated_cost
     return cost_matrix
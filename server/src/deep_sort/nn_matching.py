@@ -59,53 +59,15 @@ def _cosine_distance(a, b, data_is_normalized=False):
     return 1.0 - np.dot(a, b.T)
 
 
-def _nn_euclidean_distance(x, y):
-    """Helper function for nearest neighbor distance metric (Euclidean).
-
-    Parameters
-    ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
-
-    Returns
-    -------
-    ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest Euclidean distance to a sample in `x`.
-
-    """
-    distances = _pdist(x, y)
-    return np.maximum(0.0, distances.min(axis=0))
-
-
-def _nn_cosine_distance(x, y):
-    """Helper function for nearest neighbor distance metric (cosine).
-
-    Parameters
-    ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
-
-    Returns
-    -------
-    ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest cosine distance to a sample in `x`.
-
-    """
-    distances = _cosine_distance(x, y)
-    return distances.min(axis=0)
-
-
 class NearestNeighborDistanceMetric(object):
     """
     A nearest neighbor distance metric that, for each target, returns
     the closest distance to any sample that has been observed so far.
 
+    Samples of each target are kept in a preallocated ring buffer, which
+    holds the last `budget` samples (or grows if the budget is None). For the
+    cosine metric the samples are normalized once when they are added.
+
     Parameters
     ----------
     metric : str
@@ -119,23 +81,28 @@ class NearestNeighborDistanceMetric(object):
 
     Attributes
     ----------
-    samples : Dict[int -> List[ndarray]]
-        A dictionary that maps from target identities to the list of samples
-        that have been observed so far.
+    samples : Dict[int -> ndarray]
+        A dictionary that maps from target identities to the buffer of
+        samples that have been observed so far. Only the first
+        `counts[target]` rows of a buffer are valid, in no particular order.
+    counts : Dict[int -> int]
+        A dictionary that maps from target identities to the number of
+        samples that have been observed so far.
 
     """
 
     def __init__(self, metric, matching_threshold, budget=None):
 
         if metric == "euclidean":
-            self._metric = _nn_euclidean_distance
+            self._normalize = False
         elif metric == "cosine":
-            self._metric = _nn_cosine_distance
+            self._normalize = True
         else:
             raise ValueError("Invalid metric; must be either 'euclidean' or 'cosine'")
         self.matching_threshold = matching_threshold
         self.budget = budget
         self.samples = {}
+        self.counts = {}
 
     def partial_fit(self, features, targets, active_targets):
         """Update the distance metric with new data.
@@ -150,15 +117,34 @@ class NearestNeighborDistanceMetric(object):
             A list of targets that are currently present in the scene.
 
         """
+        features = np.asarray(features, dtype=np.float32)
+        if self._normalize and len(features) > 0:
+            features = features / np.linalg.norm(features, axis=1, keepdims=True)
+
         for feature, target in zip(features, targets):
-            self.samples.setdefault(target, []).append(feature)
-            if self.budget is not None:
-                self.samples[target] = self.samples[target][-self.budget :]
+            count = self.counts.get(target, 0)
+            buffer = self.samples.get(target)
+            if buffer is None:
+                capacity = self.budget if self.budget is not None else 16
+                buffer = np.empty((capacity, len(feature)), np.float32)
+            elif self.budget is None and count == len(buffer):
+                buffer = np.concatenate((buffer, np.empty_like(buffer)))
+
+            # The oldest sample is overwritten when the budget is reached
+            buffer[count % len(buffer)] = feature
+            self.samples[target] = buffer
+            self.counts[target] = count + 1
+
         self.samples = {k: self.samples[k] for k in active_targets}
+        self.counts = {k: self.counts[k] for k in active_targets}
 
     def distance(self, features, targets):
         """Compute distance between features and targets.
 
+        Samples of all targets are stacked into one matrix, so that the
+        distances are computed by a single matrix multiplication and reduced
+        to the closest sample of each target.
+
         Parameters
         ----------
         features : ndarray
@@ -174,7 +160,21 @@ class NearestNeighborDistanceMetric(object):
             `targets[i]` and `features[j]`.
 
         """
-        cost_matrix = np.zeros((len(targets), len(features)))
-        for i, target in enumerate(targets):
-            cost_matrix[i, :] = self._metric(self.samples[target], features)
-        return cost_matrix
+        if len(targets) == 0 or len(features) == 0:
+            return np.zeros((len(targets), len(features)))
+
+        counts = [
+            min(self.counts[target], len(self.samples[target])) for target in targets
+        ]
+        samples = np.concatenate(
+            [self.samples[target][:count] for target, count in zip(targets, counts)]
+        )
+        offsets = np.cumsum([0] + counts[:-1])
+
+        if self._normalize:
+            features = np.asarray(features, dtype=np.float32)
+            features = features / np.linalg.norm(features, axis=1, keepdims=True)
+            distances = _cosine_distance(samples, features, data_is_normalized=True)
+        else:
+            distances = np.maximum(0.0, _pdist(samples, features))
+        return np.minimum.reduceat(distances, offsets, axis=0).astype(np.float64)
@@ -5,6 +5,8 @@
 # License: GPLv3
 # Modified by Jakub Sadilek
 
+import numpy as np
+
 
 class TrackState:
     """
@@ -21,6 +23,105 @@ class TrackState:
     Deleted = 3
 
 
+class TrackStore:
+    """
+    Contiguous storage of state distributions of tracks. Means and covariances
+    of all stored tracks are kept in the first `size` rows of `(N, 8)` and
+    `(N, 8, 8)` arrays, so that Kalman filter steps of all tracks are computed
+    by a few batched operations. Tracks access their rows by a slot index.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of tracks the arrays are allocated for, the arrays grow when
+        needed.
+
+    Attributes
+    ----------
+    mean : ndarray
+        Mean vectors of the state distributions.
+    covariance : ndarray
+        Covariance matrices of the state distributions.
+    size : int
+        Number of stored tracks.
+
+    """
+
+    def __init__(self, capacity=64):
+        self.mean = np.empty((capacity, 8))
+        self.covariance = np.empty((capacity, 8, 8))
+        self.size = 0
+        self._owners = []
+
+    def add(self, track, mean, covariance):
+        """Store state distribution of the track in the first free slot."""
+        if self.size == len(self.mean):
+            capacity = max(2 * self.size, 1)
+            self.mean = np.resize(self.mean, (capacity, 8))
+            self.covariance = np.resize(self.covariance, (capacity, 8, 8))
+
+        self.mean[self.size] = mean
+        self.covariance[self.size] = covariance
+        self._owners.append(track)
+        track._store, track._slot = self, self.size
+        self.size += 1
+
+    def remove(self, track):
+        """Remove the track from the store. The last stored track is moved to
+        the freed slot, the removed track keeps a copy of its state in a store
+        of its own.
+
+        """
+        slot, last = track._slot, self.size - 1
+        mean, covariance = self.mean[slot].copy(), self.covariance[slot].copy()
+        if slot != last:
+            self.mean[slot] = self.mean[last]
+            self.covariance[slot] = self.covariance[last]
+            moved = self._owners[last]
+            moved._slot = slot
+            self._owners[slot] = moved
+        self._owners.pop()
+        self.size -= 1
+
+        TrackStore(1).add(track, mean, covariance)
+
+    def predict(self, kf):
+        """Run Kalman filter prediction step of all stored tracks.
+
+        Parameters
+        ----------
+        kf : kalman_filter.KalmanFilter
+            The Kalman filter.
+
+        """
+        if self.size == 0:
+            return
+        self.mean[: self.size], self.covariance[: self.size] = kf.predict_batch(
+            self.mean[: self.size], self.covariance[: self.size]
+        )
+
+    def update(self, kf, tracks, measurements):
+        """Run Kalman filter correction step of the given stored tracks.
+
+        Parameters
+        ----------
+        kf : kalman_filter.KalmanFilter
+            The Kalman filter.
+        tracks : List[Track]
+            Tracks of this store to be updated.
+        measurements : ndarray
+            The Nx4 dimensional matrix of measurements (x, y, a, h), one for
+            each track.
+
+        """
+        if len(tracks) == 0:
+            return
+        slots = np.array([track._slot for track in tracks])
+        self.mean[slots], self.covariance[slots] = kf.update_batch(
+            self.mean[slots], self.covariance[slots], measurements
+        )
+
+
 class Track:
     """
     A single target track with state space `(x, y, a, h)` and associated
@@ -45,13 +146,17 @@ class Track:
     feature : Optional[ndarray]
         Feature vector of the detection this track originates from. If not None,
         this feature is added to the `features` cache.
+    store : Optional[TrackStore]
+        Store of the state distribution shared with other tracks. If None,
+        the track has a store of its own.
 
     Attributes
     ----------
     mean : ndarray
-        Mean vector of the initial state distribution.
+        Mean vector of the current state distribution, a view of the store.
     covariance : ndarray
-        Covariance matrix of the initial state distribution.
+        Covariance matrix of the current state distribution, a view of the
+        store.
     track_id : int
         A unique track identifier.
     hits : int
@@ -85,8 +190,11 @@ class Track:
         faceDistance=None,
         personId="",
         faceId="",
+        store=None,
     ):
-        self.mean = mean
+        if store is None:
+            store = TrackStore(1)
+        store.add(self, mean, covariance)
         self.label = label
         self.confidence = conf
         self.identity = identity
@@ -97,7 +205,6 @@ class Track:
         self.bboxColor = bboxColor
         self.cornerColor = cornerColor
         self.textColor = textColor
-        self.covariance = covariance
         self.track_id = track_id
         self.hits = 1
         self.age = 1
@@ -112,6 +219,22 @@ class Track:
         self._n_init = n_init
         self._max_age = max_age
 
+    @property
+    def mean(self):
+        return self._store.mean[self._slot]
+
+    @mean.setter
+    def mean(self, value):
+        self._store.mean[self._slot] = value
+
+    @property
+    def covariance(self):
+        return self._store.covariance[self._slot]
+
+    @covariance.setter
+    def covariance(self, value):
+        self._store.covariance[self._slot] = value
+
     def to_tlwh(self):
         """Get current position in bounding box format `(top left x, top left y,
         width, height)`.
@@ -141,6 +264,29 @@ class Track:
         ret[2:] = ret[:2] + ret[2:]
         return ret
 
+    def extrapolate_tlwh(self, kf, dt):
+        """Get position extrapolated by `dt` time steps from the current state
+        in bounding box format `(top left x, top left y, width, height)`. The
+        state of the track is not changed.
+
+        Parameters
+        ----------
+        kf : kalman_filter.KalmanFilter
+            The Kalman filter.
+        dt : float
+            Number of time steps, e.g. 0.5 for the middle between two steps.
+
+        Returns
+        -------
+        ndarray
+            The bounding box.
+
+        """
+        ret = kf.extrapolate(self.mean, dt)[:4]
+        ret[2] *= ret[3]
+        ret[:2] -= ret[2:] / 2
+        return ret
+
     def predict(self, kf):
         """Propagate the state distribution to the current time step using a
         Kalman filter prediction step.
@@ -152,6 +298,13 @@ class Track:
 
         """
         self.mean, self.covariance = kf.predict(self.mean, self.covariance)
+        self.mark_predicted()
+
+    def mark_predicted(self):
+        """Advance counters of the track by one time step, after its state
+        distribution was propagated (by `predict` or by the track store).
+
+        """
         self.age += 1
         self.time_since_update += 1
 
@@ -170,6 +323,19 @@ class Track:
         self.mean, self.covariance = kf.update(
             self.mean, self.covariance, detection.to_xyah()
         )
+        self.mark_hit(detection)
+
+    def mark_hit(self, detection):
+        """Update the feature cache and attributes of the track by the
+        associated detection, after its state distribution was corrected (by
+        `update` or by the track store).
+
+        Parameters
+        ----------
+        detection : Detection
+            The associated detection.
+
+        """
         self.features.append(detection.feature)
 
         self.hits += 1
@@ -182,19 +348,40 @@ class Track:
 
         # Better face matching => update name (identity)
         if self.label == "person":
-            newFaceDistance = detection.get_faceDistance()
-
-            if (
-                self.faceDistance > newFaceDistance
-                and newFaceDistance < self.faceDistanceUpdateThreshold
-            ):
-                self.identity = detection.get_identity()
-                self.faceDistance = newFaceDistance
-                self.personId = detection.get_personId()
-                self.faceId = detection.get_faceId()
+            self.update_identity(
+                detection.get_identity(),
+                detection.get_faceDistance(),
+                detection.get_personId(),
+                detection.get_faceId(),
+            )
 
         self.trail.append(detection.center)
 
+    def update_identity(self, identity, faceDistance, personId, faceId):
+        """Update identity of the tracked person if the face matches better
+        than before and the face distance is below the update threshold.
+
+        Parameters
+        ----------
+        identity : str
+            Identity of the recognized person.
+        faceDistance : float
+            Face distance of the recognized person.
+        personId : str
+            ID of the recognized person.
+        faceId : str
+            Face image ID of the recognized person.
+
+        """
+        if (
+            self.faceDistance > faceDistance
+            and faceDistance < self.faceDistanceUpdateThreshold
+        ):
+            self.identity = identity
+            self.faceDistance = faceDistance
+            self.personId = personId
+            self.faceId = faceId
+
     def mark_missed(self):
         """Mark this track as missed (no association at the current time step)."""
         if self.state == TrackState.Tentative:
@@ -10,7 +10,7 @@ import numpy as np
 from . import kalman_filter
 from . import linear_assignment
 from . import iou_matching
-from .track import Track
+from .track import Track, TrackStore
 
 
 class Tracker:
@@ -40,6 +40,8 @@ class Tracker:
         A Kalman filter to filter target trajectories in image space.
     tracks : List[Track]
         The list of active tracks at the current time step.
+    store : TrackStore
+        Contiguous storage of state distributions of the active tracks.
 
     """
 
@@ -51,6 +53,7 @@ class Tracker:
 
         self.kf = kalman_filter.KalmanFilter()
         self.tracks = []
+        self.store = TrackStore()
         self._next_id = 1
 
     def predict(self):
@@ -58,8 +61,9 @@ class Tracker:
 
         This function should be called once every time step, before `update`.
         """
+        self.store.predict(self.kf)
         for track in self.tracks:
-            track.predict(self.kf)
+            track.mark_predicted()
 
     def update(self, detections):
         """Perform measurement update and track management.
@@ -73,13 +77,21 @@ class Tracker:
         # Run matching cascade.
         matches, unmatched_tracks, unmatched_detections = self._match(detections)
 
-        # Update track set.
+        # Update track set, states of matched tracks are corrected at once.
+        self.store.update(
+            self.kf,
+            [self.tracks[track_idx] for track_idx, _ in matches],
+            np.asarray([detections[i].to_xyah() for _, i in matches]),
+        )
         for track_idx, detection_idx in matches:
-            self.tracks[track_idx].update(self.kf, detections[detection_idx])
+            self.tracks[track_idx].mark_hit(detections[detection_idx])
         for track_idx in unmatched_tracks:
             self.tracks[track_idx].mark_missed()
         for detection_idx in unmatched_detections:
             self._initiate_track(detections[detection_idx])
+        for track in self.tracks:
+            if track.is_deleted():
+                self.store.remove(track)
         self.tracks = [t for t in self.tracks if not t.is_deleted()]
 
         # Update distance metric.
@@ -169,6 +181,7 @@ class Tracker:
                 detection.get_faceDistance(),
                 detection.get_personId(),
                 detection.get_faceId(),
+                self.store,
             )
         )
         self._next_id += 1
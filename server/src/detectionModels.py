@@ -0,0 +1,52 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+# Models available for object detection, selected by the argument '--model'.
+#   config: Darknet configuration, None for models already exported to ONNX.
+#   weights: Default weights (Darknet weights or ONNX model).
+#   labels: File with class names in order of the model outputs.
+#   inputShape: Size of the square input of the network.
+#   format: Format of outputs, "yolov3" rows [cx, cy, w, h, objectness, scores...] relative
+#           to the input, "yolov8" columns [cx, cy, w, h, scores...] in pixels of the input.
+#   confThreshold, nmsThreshold: Thresholds of detections and of their suppression.
+MODELS = {
+    "yolo320": {
+        "config": "yolov3/yolov3-320.cfg",
+        "weights": "yolov3/yolov3.weights",
+        "labels": "coco.names",
+        "inputShape": 320,
+        "format": "yolov3",
+        "confThreshold": 0.55,
+        "nmsThreshold": 0.4,
+    },
+    "yolo608": {
+        "config": "yolov3/yolov3-608.cfg",
+        "weights": "yolov3/yolov3.weights",
+        "labels": "coco.names",
+        "inputShape": 608,
+        "format": "yolov3",
+        "confThreshold": 0.55,
+        "nmsThreshold": 0.4,
+    },
+    "yolotiny": {
+        "config": "yolov3/yolov3-tiny.cfg",
+        "weights": "yolov3/yolov3-tiny.weights",
+        "labels": "coco.names",
+        "inputShape": 416,
+        "format": "yolov3",
+        "confThreshold": 0.4,
+        "nmsThreshold": 0.4,
+    },
+    "yolov8n": {
+        "config": None,
+        "weights": "yolov8/yolov8n.onnx",
+        "labels": "coco.names",
+        "inputShape": 640,
+        "format": "yolov8",
+        "confThreshold": 0.4,
+        "nmsThreshold": 0.5,
+    },
+}
@@ -7,6 +7,11 @@
 import cv2
 import numpy as np
 
+from backends import BACKENDS
+from detectionModels import MODELS
+from preprocessor import Preprocessor
+from profiler import profiler
+
 
 class Detector:
     """
@@ -14,40 +19,97 @@ class Detector:
 
     Parameters:
     classNames: Detection classes.
-    modelName: Name of the model to be used for detection.
+    modelName: Name of the model to be used for detection, see MODELS.
+    weights: Path to the file with weights of the model.
+    classAwareNMS: Set to suppress overlapping boxes only within the same class (default: False).
+    tileSize: Size of square tiles in pixels of the frame, frames are not split into tiles if not set.
+    tileOverlap: Overlap of neighbouring tiles as a fraction of the tile size (default: 0.2).
+    adaptiveTiles: Set to detect objects only in tiles with objects found in the whole frame (default: False).
+    backend: Name of the backend running the network, see BACKENDS (default: opencv).
+    threads: Number of threads of the backend, default of the backend is used if 0 (default: 0).
+    precision: Precision of the model: fp32, fp16 or int8 (default: fp32).
+    classes: Names of classes to be detected, scores of other classes are ignored (default: all classes).
+    network: Already loaded backend with the same model, weights, backend, threads and precision, if any.
     """
 
-    def __init__(self, classNames, modelName, weights):
-        self.yolo320Config = "yolov3/yolov3-320.cfg"
-        self.yolo608Config = "yolov3/yolov3-608.cfg"
+    def __init__(
+        self,
+        classNames,
+        modelName,
+        weights,
+        classAwareNMS=False,
+        tileSize=None,
+        tileOverlap=0.2,
+        adaptiveTiles=False,
+        backend="opencv",
+        threads=0,
+        precision="fp32",
+        classes=None,
+        network=None,
+    ):
+        model = MODELS[modelName]
+        self.config = model["config"]
         self.yoloWeights = weights
         self.classNames = classNames
+        self.classIds = (
+            None  # Indices of the used classes, all classes are used if None
+        )
+        if classes != None:
+            self.classIds = np.array([classNames.index(c) for c in classes])
+        self.outputFormat = model["format"]
 
-        self.confThreshold = 0.55
-        self.nmsThreshold = 0.4
-        self.inputShape = None
+        self.confThreshold = model["confThreshold"]
+        self.nmsThreshold = model["nmsThreshold"]
+        self.classAwareNMS = classAwareNMS
+        self.inputShape = model["inputShape"]
 
-        if modelName == "yolo608":  # yolo608
-            self.inputShape = 608
-            self.model = cv2.dnn.readNetFromDarknet(
-                self.yolo608Config, self.yoloWeights
-            )
-        else:  # yolo320 (default)
-            self.inputShape = 320
-            self.model = cv2.dnn.readNetFromDarknet(
-                self.yolo320Config, self.yoloWeights
-            )
+        self.tileSize = tileSize
+        self.tileOverlap = tileOverlap
+        self.adaptiveTiles = adaptiveTiles
+        # Boxes closer to an inner border of a tile are cut by the tile
+        self.tileBorder = 2
 
-        # FIXME: Uncomment for GPU acceleration with OpenCV support
-        # self.model.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-        # self.model.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        # Network is run by the selected backend, already loaded network is reused
+        self.backend = network
+        if self.backend is None:
+            self.backend = BACKENDS[backend](
+                self.config, self.yoloWeights, threads, precision
+            )
+        self.preprocessor = Preprocessor(self.inputShape)
 
         print(f"Detector: {modelName}")
         print(f"Weights: {weights}")
 
-    def filterPredictions(self, frame, outputs):
+    def prepare(self, batchSize, iterations=1, frame=None):
         """
-        Function filters only the most reliable detections from given detections.
+        Function runs the network on dummy input, so that memory of the network is allocated
+        and the first frames are not slowed down. The network is prepared for each batch
+        size only once. In the tiled mode, the network is prepared also for the batch of
+        tiles of the given frame.
+
+        Parameters:
+        batchSize: Number of images passed through the network at once.
+        iterations: Number of passes (default: 1).
+        frame: Frame of the same size as the processed frames, if tiles are prepared (default: None).
+        """
+
+        batchSizes = [batchSize]
+        if self.tileSize != None and frame is not None and len(self.tiles(frame)) > 0:
+            batchSizes.append(batchSize * len(self.tiles(frame)))
+
+        for size in batchSizes:
+            if size in self.backend.preparedBatchSizes or iterations < 1:
+                continue
+
+            blob = np.zeros((size, 3, self.inputShape, self.inputShape), np.float32)
+            for _ in range(iterations):
+                self.backend.forward(blob)
+            self.backend.preparedBatchSizes.add(size)
+
+    def decodePredictions(self, frame, outputs):
+        """
+        Function decodes detections above the confidence threshold from the network outputs.
+        Outputs of all layers are processed at once as a single matrix.
 
         Parameters:
         frame: Input image with found detections.
@@ -59,49 +121,248 @@ class Detector:
         bboxes: Array with bounding boxes.
         """
 
-        bboxes = []
-        classIds = []
-        confs = []
+        frameHeight, frameWidth = frame.shape[:2]
+
+        # Predictions of all layers (3) in one matrix, one detection per row
+        predictions = np.concatenate(
+            [output.reshape(-1, output.shape[-1]) for output in outputs]
+        )
 
-        frameHeight, frameWidth, _ = frame.shape
+        # Class scores are conditioned by the objectness, so they cannot exceed it
+        predictions = predictions[predictions[:, 4] > self.confThreshold]
 
-        for output in outputs:  # For all layers outputs (3)
-            for prediction in output:  # For each detection in the output
-                scores = prediction[
-                    5:
-                ]  # Takes only the conf. array score from the output
-                classId = np.argmax(scores)  # Position with the highest confidence
-                confidence = scores[classId]  # The value of the highest confidence
+        # Takes only the conf. array score from the output, only of the used classes
+        if self.classIds is None:
+            scores = predictions[:, 5:]
+        else:
+            scores = predictions[:, 5 + self.classIds]
+        classIds = np.argmax(scores, axis=1)  # Position with the highest confidence
+        confs = scores[np.arange(scores.shape[0]), classIds]  # The highest confidence
+        if self.classIds is not None:
+            classIds = self.classIds[classIds]
 
-                if confidence > self.confThreshold:
-                    # Central point in the middle of the bounding box
-                    cx = int(prediction[0] * frameWidth)
-                    cy = int(prediction[1] * frameHeight)
+        # Keep only predictions above the threshold
+        mask = confs > self.confThreshold
+        predictions = predictions[mask]
+        classIds = classIds[mask]
+        confs = confs[mask]
 
-                    # Box dimensions and coordinates of the upper left corner
-                    w = int(prediction[2] * frameWidth)
-                    h = int(prediction[3] * frameHeight)
-                    x = int(cx - (w >> 1))
-                    y = int(cy - (h >> 1))
+        # Central point in the middle of the bounding box
+        cx = (predictions[:, 0] * frameWidth).astype(np.int32)
+        cy = (predictions[:, 1] * frameHeight).astype(np.int32)
 
-                    bboxes.append([x, y, w, h])  # Save bounding box
-                    classIds.append(classId)  # Save class ID
-                    confs.append(float(confidence))  # Save conf. score
+        # Box dimensions and coordinates of the upper left corner
+        w = (predictions[:, 2] * frameWidth).astype(np.int32)
+        h = (predictions[:, 3] * frameHeight).astype(np.int32)
+        bboxes = np.stack((cx - (w >> 1), cy - (h >> 1), w, h), axis=1)
+
+        return classIds, confs, bboxes
+
+    def suppress(self, frame, classIds, confs, bboxes):
+        """
+        Function removes overlapping detections using non-maximum suppression.
+
+        Parameters:
+        frame: Input image with found detections.
+        classIds: Array with ids.
+        confs: Array with confidence scores.
+        bboxes: Array with bounding boxes.
+
+        Returns:
+        ids: Array with ids.
+        confidences: Array with confidence scores.
+        bboxes: Array with bounding boxes.
+        """
+
+        if bboxes.shape[0] == 0:
+            return classIds, confs, bboxes
+
+        # Boxes of different classes are shifted apart, so they never overlap during suppression
+        nmsBboxes = bboxes
+        if self.classAwareNMS == True:
+            offset = int(max(frame.shape[:2])) * 2
+            nmsBboxes = bboxes.copy()
+            nmsBboxes[:, :2] += (classIds * offset)[:, None].astype(np.int32)
 
         # Get indices of non-overlapping bboxes using non-maximum suppression
-        indices = cv2.dnn.NMSBoxes(bboxes, confs, self.confThreshold, self.nmsThreshold)
+        indices = cv2.dnn.NMSBoxes(
+            nmsBboxes.tolist(), confs.tolist(), self.confThreshold, self.nmsThreshold
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
 
         # Filter only the correct bboxes after suppression
-        filtered_bboxes = []
-        filtered_classIds = []
-        filtered_confs = []
+        return classIds[indices], confs[indices], bboxes[indices]
 
-        for idx in indices:
-            filtered_bboxes.append(bboxes[idx])
-            filtered_classIds.append(classIds[idx])
-            filtered_confs.append(confs[idx])
+    def filterPredictions(self, frame, outputs):
+        """
+        Function filters only the most reliable detections from given detections.
 
-        return filtered_classIds, filtered_confs, filtered_bboxes
+        Parameters:
+        frame: Input image with found detections.
+        outputs: YOLO network outputs.
+
+        Returns:
+        ids: Array with ids.
+        confidences: Array with confidence scores.
+        bboxes: Array with bounding boxes.
+        """
+
+        return self.suppress(frame, *self.decodePredictions(frame, outputs))
+
+    def convertOutput(self, output):
+        """
+        Function converts YOLOv8 output to the format of YOLOv3 outputs. Boxes are made relative
+        to the input and objectness is set to 1, so that the class scores remain unchanged.
+
+        Parameters:
+        output: Output of shape (N, 4 + classes, boxes) with boxes in pixels of the input.
+
+        Returns:
+        output: Output of shape (N, boxes, 5 + classes).
+        """
+
+        rows = output.transpose(0, 2, 1)
+        bboxes = rows[..., :4] / self.inputShape
+        objectness = np.ones(rows.shape[:2] + (1,), dtype=rows.dtype)
+
+        return np.concatenate((bboxes, objectness, rows[..., 4:]), axis=2)
+
+    def forward(self, images):
+        """
+        Function passes images through the network in a single forward pass.
+
+        Parameters:
+        images: Images to be processed.
+
+        Returns:
+        outputs: YOLO network outputs for each image in the same order.
+        """
+
+        # Convert images to one blob, images are stacked along the batch dimension
+        with profiler.measure("detect.blob"):
+            blob = self.preprocessor.blobFromImages(images)
+
+        with profiler.measure("detect.forward"):
+            # Pass blob to the network
+            outputs = self.backend.forward(blob)
+
+        # Outputs with one column per box are converted to the YOLOv3 format
+        if self.outputFormat == "yolov8":
+            outputs = [self.convertOutput(output) for output in outputs]
+
+        # Split outputs of each layer by images, rows of an image are stored contiguously
+        outputs = [
+            output.reshape(len(images), -1, output.shape[-1]) for output in outputs
+        ]
+
+        return [[output[i] for output in outputs] for i in range(len(images))]
+
+    def tiles(self, frame):
+        """
+        Function splits the frame into overlapping square tiles, which cover the whole frame.
+
+        Parameters:
+        frame: Image to be split.
+
+        Returns:
+        tiles: Tiles in format [x1, y1, x2, y2], empty if the frame fits into one tile.
+        """
+
+        frameHeight, frameWidth = frame.shape[:2]
+        if frameWidth <= self.tileSize and frameHeight <= self.tileSize:
+            return []
+
+        def starts(length):
+            if length <= self.tileSize:
+                return [0]
+
+            # Tiles are spread evenly, neighbours overlap at least by the given fraction
+            overlap = int(self.tileSize * self.tileOverlap)
+            count = int(np.ceil((length - overlap) / (self.tileSize - overlap)))
+            return np.linspace(0, length - self.tileSize, count).astype(int).tolist()
+
+        return [
+            [
+                x,
+                y,
+                min(x + self.tileSize, frameWidth),
+                min(y + self.tileSize, frameHeight),
+            ]
+            for y in starts(frameHeight)
+            for x in starts(frameWidth)
+        ]
+
+    def predictTiled(self, frames):
+        """
+        Function detects objects in whole frames and in their tiles, so that small objects
+        are detected in higher resolution. Detections from tiles are mapped to the frame and
+        merged with detections in the whole frame by non-maximum suppression.
+
+        Parameters:
+        frames: Images in which objects will be detected.
+
+        Returns:
+        predictions: Tuple (ids, confs, bboxes) for each image in the same order.
+        """
+
+        # Coarse pass over whole frames, decoding and merging are measured as filtering
+        outputs = self.forward(frames)
+        with profiler.measure("detect.filter"):
+            detections = [
+                self.decodePredictions(frame, frameOutputs)
+                for frame, frameOutputs in zip(frames, outputs)
+            ]
+
+            # Tiles of all frames (with frame index), only tiles with coarse objects in adaptive mode
+            tiles = []
+            for i, frame in enumerate(frames):
+                frameTiles = self.tiles(frame)
+                if self.adaptiveTiles == True and len(frameTiles) > 0:
+                    _, _, bboxes = self.suppress(frame, *detections[i])
+                    frameTiles = [
+                        [x1, y1, x2, y2]
+                        for x1, y1, x2, y2 in frameTiles
+                        if np.any(
+                            (bboxes[:, 0] < x2)
+                            & (bboxes[:, 0] + bboxes[:, 2] > x1)
+                            & (bboxes[:, 1] < y2)
+                            & (bboxes[:, 1] + bboxes[:, 3] > y1)
+                        )
+                    ]
+                tiles += [(i, tile) for tile in frameTiles]
+
+        crops = [frames[i][y1:y2, x1:x2] for i, (x1, y1, x2, y2) in tiles]
+        outputs = self.forward(crops) if len(crops) > 0 else []
+
+        with profiler.measure("detect.filter"):
+            for (i, (x1, y1, x2, y2)), crop, tileOutputs in zip(tiles, crops, outputs):
+                classIds, confs, bboxes = self.decodePredictions(crop, tileOutputs)
+                frameHeight, frameWidth = frames[i].shape[:2]
+
+                # Objects cut by an inner border of the tile are detected in the neighbouring tile
+                cut = np.zeros(bboxes.shape[0], dtype=bool)
+                if x1 > 0:
+                    cut |= bboxes[:, 0] <= self.tileBorder
+                if y1 > 0:
+                    cut |= bboxes[:, 1] <= self.tileBorder
+                if x2 < frameWidth:
+                    cut |= bboxes[:, 0] + bboxes[:, 2] >= x2 - x1 - self.tileBorder
+                if y2 < frameHeight:
+                    cut |= bboxes[:, 1] + bboxes[:, 3] >= y2 - y1 - self.tileBorder
+
+                bboxes = bboxes[~cut] + np.array([x1, y1, 0, 0], dtype=np.int32)
+                detections[i] = tuple(
+                    np.concatenate(parts)
+                    for parts in zip(
+                        detections[i], (classIds[~cut], confs[~cut], bboxes)
+                    )
+                )
+
+            # Global suppression of detections from the frame and all its tiles
+            return [
+                self.suppress(frame, *frameDetections)
+                for frame, frameDetections in zip(frames, detections)
+            ]
 
     def predict(self, frame):
         """
@@ -116,25 +377,35 @@ class Detector:
         bboxes: Array with bounding boxes.
         """
 
-        # Convert frame to blob
-        blob = cv2.dnn.blobFromImage(
-            frame,
-            1 / 255,
-            (self.inputShape, self.inputShape),
-            (0, 0, 0),
-            swapRB=True,
-            crop=False,
-        )
+        return self.predictBatch([frame])[0]
+
+    def predictBatch(self, frames):
+        """
+        The function detects objects in several images at once, all images pass through
+        the network in a single forward pass.
+
+        Parameters:
+        frames: Images in which objects will be detected.
+
+        Returns:
+        predictions: Tuple (labels, confs, bboxes) for each image in the same order, see predict.
+        """
 
-        # Pass blob to the network
-        self.model.setInput(blob)
+        if len(frames) == 0:
+            return []
 
-        # Get outputs from the yolo network
-        outputLayersNames = self.model.getUnconnectedOutLayersNames()
-        outputs = self.model.forward(outputLayersNames)
+        if self.tileSize != None:
+            detections = self.predictTiled(frames)
+        else:
+            detections = []
+            for frame, outputs in zip(frames, self.forward(frames)):
+                # Filter outputs and get detections
+                with profiler.measure("detect.filter"):
+                    detections.append(self.filterPredictions(frame, outputs))
 
-        # Filter outputs and get detections
-        classIds, confs, bboxes = self.filterPredictions(frame, outputs)
-        labels = [self.classNames[id] for id in classIds]
+        predictions = []
+        for classIds, confs, bboxes in detections:
+            labels = [self.classNames[id] for id in classIds]
+            predictions.append((labels, confs.tolist(), bboxes.tolist()))
 
-        return labels, confs, bboxes
+        return predictions
@@ -8,13 +8,18 @@ import sys
 import cv2
 import time
 import datetime
+import numpy as np
 
 from argParser import argumentParser
 from detection import Detection
-from detector import Detector
-from recognizer import Recognizer
-from tracker import Tracker
+from models import Models
+from detectionModels import MODELS
+from scheduler import RecognitionScheduler
 from recorder import Recorder
+from progress import Progress
+from pipeline import Pipeline
+from motion import MotionDetector
+from profiler import profiler
 from quietStdout import QuietStdout
 
 textFont = cv2.FONT_HERSHEY_DUPLEX
@@ -35,8 +40,7 @@ OBJECTS = [
     "giraffe",
 ]
 
-labelFile = "coco.names"
-args = argumentParser()
+args = None  # Program arguments of the processed job
 
 
 def draw(frame, detection, fps):
@@ -139,21 +143,293 @@ def draw(frame, detection, fps):
                 )
 
 
-def main():
-    # Load classes from a file
+def inArea(detection):
+    """
+    Function checks whether the center of the detection lies in the detection area.
+    Full frame is considered when the detection area is not set.
+
+    Parameters:
+    detection: Detection to be checked.
+    """
+
+    if args.area == None:
+        return True
+
+    return (
+        detection.center[0] >= args.area[0]
+        and detection.center[0] <= args.area[2]
+        and detection.center[1] >= args.area[1]
+        and detection.center[1] <= args.area[3]
+    )
+
+
+def detectionRegion(frame):
+    """
+    Function returns the region of the frame on which objects are detected. Only the detection
+    area extended by a margin is used in the ROI mode, so that the detector does not process
+    the rest of the frame and small objects in the area have higher resolution.
+
+    Parameters:
+    frame: Frame to be analyzed.
+
+    Returns:
+    region: Region in format [x1, y1, x2, y2] or None if the full frame is used.
+    """
+
+    if args.roi == False or args.area == None:
+        return None
+
+    height, width = frame.shape[:2]
+    x1 = max(args.area[0] - args.roi_margin, 0)
+    y1 = max(args.area[1] - args.roi_margin, 0)
+    x2 = min(args.area[2] + args.roi_margin, width)
+    y2 = min(args.area[3] + args.roi_margin, height)
+
+    # Detection area outside of the frame
+    if x2 <= x1 or y2 <= y1:
+        return None
+
+    return [x1, y1, x2, y2]
+
+
+def recognize(frame, detections, recognizer):
+    """
+    Function tries to recognize each person among the detections by face.
+
+    Parameters:
+    frame: Frame on which the detections were obtained.
+    detections: Detections of objects, identity is set for persons.
+    recognizer: Recognizer used for face recognition.
+    """
+
+    # Redirect stdout due to DeepFace dumps
+    with QuietStdout():
+        # Trying to recognize each person
+        for detection in detections:
+            if detection.label == "person":
+                # Feed DeepFace with image of the person and get informations
+                # that will determine identity of the person
+                identity, faceDistance, personId, faceId = recognizer.findInFrame(
+                    frame, detection.bbox
+                )
+                detection.setIdentity(identity, faceDistance, personId, faceId)
+
+
+def analyze(frames, steps, detector, recognizer, tracker, scheduler):
+    """
+    Function performs detection, face recognition and tracking on the given frames.
+    Detection runs on all detection frames at once, the rest is done frame by frame in order.
+    Objects on frames between detection frames are obtained from the tracker only.
+
+    Parameters:
+    frames: Consecutive frames to be analyzed.
+    steps: Number of frames since the last detection frame for each frame (0 for detection frames).
+    detector: Object detector.
+    recognizer: Face recognizer, used only if recognition is set.
+    tracker: Object tracker, used only if tracking is set.
+    scheduler: Scheduler of face recognition of tracks, used if both recognition and tracking are set.
+
+    Returns:
+    results: Objects of class Detection found in each frame.
+    """
+
+    # All frames of the batch may be skipped
+    if len(frames) == 0:
+        return []
+
+    # Object detection, only the region around the detection area is used in the ROI mode
+    detectionFrames = [frame for frame, step in zip(frames, steps) if step == 0]
+    region = detectionRegion(frames[0])
+    if region == None:
+        predictions = detector.predictBatch(detectionFrames)
+    else:
+        x1, y1, x2, y2 = region
+        predictions = detector.predictBatch(
+            [frame[y1:y2, x1:x2] for frame in detectionFrames]
+        )
+
+    # Store obtained detections into objects
+    detectionsList = []
+    for labels, confs, bboxes in predictions:
+        detections = []
+        for label, conf, bbox in zip(labels, confs, bboxes):
+            # Map the bounding box from the region back to the frame
+            if region != None:
+                bbox = [bbox[0] + x1, bbox[1] + y1, bbox[2], bbox[3]]
+            detection = Detection(label, conf, bbox)
+
+            # Objects outside the detection area are not tracked nor recognized in the ROI mode
+            if region != None and inArea(detection) == False:
+                continue
+            detections.append(detection)
+        detectionsList.append(detections)
+
+    # Appearance features for tracking of all detection frames at once
+    featuresList = [None] * len(detectionsList)
+    if args.tracking == True:
+        featuresList = tracker.encode(detectionFrames, detectionsList)
+
+    analyzed = iter(zip(detectionsList, featuresList))
+
+    results = []
+    for frame, step in zip(frames, steps):
+        # Frame between detection frames, objects are predicted by the tracker
+        if step != 0:
+            results.append(tracker.interpolate(step / args.detect_every))
+            continue
+
+        detections, features = next(analyzed)
+
+        # Face recognition of each detection, if objects are not tracked
+        if args.recognition == True and args.tracking == False:
+            with profiler.measure("recognize"):
+                recognize(frame, detections, recognizer)
+
+        # Tracking, if set, returns new objects of class Detection
+        if args.tracking == True:
+            detections = tracker.track(frame, detections, features)
+
+            # Face recognition of tracks, identities are kept by the tracker
+            if args.recognition == True:
+                with profiler.measure("recognize"):
+                    scheduler.recognize(frame, detections, tracker)
+
+        results.append(detections)
+
+    return results
+
+
+def render(frame, detections, timeStamp, recorder, objectIDs, fps):
+    """
+    Function renders detections and enabled overlays into the frame and records
+    detections for the output summary.
+
+    Parameters:
+    frame: Frame for write into.
+    detections: Detections found in the frame.
+    timeStamp: Time of the frame in the video in seconds.
+    recorder: Recorder of detections for the output summary.
+    objectIDs: Set of object IDs, used to count unique objects in the video.
+    fps: Video FPS, it is used to calculate length of tracks.
+    """
+
+    frameHeight = frame.shape[0]
+
+    # Render detections
+    for detection in detections:
+        # If car detection is not set, then skip
+        if detection.label == "car" and args.cars == False:
+            continue
+
+        # Detected class must be among detection classes and in the detection area
+        if detection.label in OBJECTS and inArea(detection):
+            draw(frame, detection, fps)
+            recorder.add(detection, timeStamp)
+
+    # Render detection area in frame, if set
+    if args.frame == True and args.area != None:
+        cv2.rectangle(
+            frame,
+            (args.area[0], args.area[1]),
+            (args.area[2], args.area[3]),
+            (27, 26, 222),
+            2,
+        )
+
+    # Plot counters on frame, if set
+    if args.tracking == True and args.counter == True:
+        currentObjects = 0
+        for detection in detections:
+            # Skip cars if not set
+            if detection.label == "car" and args.cars == False:
+                continue
+
+            # Counting objects in the detection area (all objects if not set)
+            if detection.label in OBJECTS and inArea(detection):
+                objectIDs.add(detection.trackId)
+                currentObjects += 1
+
+        cv2.putText(
+            frame,
+            f"Objects: {currentObjects}",
+            (20, frameHeight - 70),
+            textFont,
+            0.6,
+            (255, 255, 255),
+            1,
+        )
+        cv2.putText(
+            frame,
+            f"Total: {len(objectIDs)}",
+            (20, frameHeight - 50),
+            textFont,
+            0.6,
+            (255, 255, 255),
+            1,
+        )
+
+    # Write current time of the video on frame, if set
+    if args.timestamp == True:
+        cv2.putText(
+            frame,
+            f"{datetime.timedelta(seconds=timeStamp)}",
+            (20, frameHeight - 20),
+            textFont,
+            0.7,
+            (255, 255, 255),
+            1,
+        )
+
+
+def process(models):
+    """
+    Function processes the input video according to the program arguments.
+
+    Parameters:
+    models: Loaded models, see Models.
+    """
+
+    # Load classes of the model from a file
     classNames = []
-    with open(labelFile) as f:
+    with open(MODELS[args.model]["labels"]) as f:
         classNames = f.read().rstrip("\n").split("\n")
 
-    # Detector initialization
-    detector = Detector(classNames, args.model, args.weights)
+    # Detector initialization, only objects shown in the output are detected
+    detector = models.getDetector(
+        classNames,
+        args.model,
+        args.weights,
+        args.class_nms,
+        args.tile_size if args.tiled == True else None,
+        args.tile_overlap,
+        args.adaptive_tiles,
+        args.backend,
+        args.threads,
+        args.precision,
+        [label for label in OBJECTS if label != "car" or args.cars == True],
+    )
 
-    # DeepFace initialization
-    recognizer = Recognizer(args.database)
+    # DeepFace initialization, face database is embedded at once
+    recognizer = None
+    if args.recognition == True:
+        recognizer = models.getRecognizer(args.database)
 
     # DeepSort tracker initialization
+    tracker = None
     if args.tracking == True:
-        tracker = Tracker()
+        tracker = models.getTracker(
+            args.nn_budget if args.nn_budget > 0 else None, args.detect_every
+        )
+
+    # Tracked persons are recognized only occasionally
+    scheduler = None
+    if args.tracking == True and args.recognition == True:
+        scheduler = RecognitionScheduler(
+            recognizer,
+            args.recognition_interval,
+            args.recognition_min_size,
+            args.recognition_lock,
+        )
 
     # Initialization of recorder for the output summary
     recorder = Recorder(OBJECTS)
@@ -177,6 +453,14 @@ def main():
         args.area[2] = args.area[2] if args.area[2] <= videoWidth else videoWidth
         args.area[3] = args.area[3] if args.area[3] <= videoHeight else videoHeight
 
+    # Memory of the network is allocated before the first frame, also for batches of tiles
+    # of the detected region
+    emptyFrame = np.zeros((videoHeight, videoWidth, 3), np.uint8)
+    region = detectionRegion(emptyFrame)
+    if region != None:
+        emptyFrame = emptyFrame[region[1] : region[3], region[0] : region[2]]
+    detector.prepare(args.batch_size, args.warm_up, emptyFrame)
+
     outputVideo = cv2.VideoWriter(
         args.output + ".mp4", codec, videoFPS, (videoWidth, videoHeight)
     )
@@ -184,164 +468,116 @@ def main():
     # Set of object IDs, used to count unique objects in the video
     objectIDs = set()
 
-    # Variables for progress calculation
-    sendLimit = frameCnt // 20
-    sentProgress = 1
-    progressFrame = 0
-
-    print("Progress: 0 %", flush=True)
-
-    while True:
-        ret, frame = video.read()
-
-        # Frame availability check
-        if not ret:
-            break
-
-        frameNum = int(video.get(cv2.CAP_PROP_POS_FRAMES))
-        timeStamp = int(frameNum / videoFPS)
-
-        # Show progress every 5%
-        if progressFrame == sendLimit:
-            print("Progress: " + str(min(sentProgress * 5, 100)) + " %", flush=True)
-            sentProgress += 1
-            progressFrame = 0
-        progressFrame += 1
-
-        # Object detection
-        labels, confs, bboxes = detector.predict(frame)
-
-        # Store obtained detections into objects
-        detections = []
-        for label, conf, bbox in zip(labels, confs, bboxes):
-            detections.append(Detection(label, conf, bbox))
-
-        # Face recognition
-        if args.recognition == True:
-            # Redirect stdout due to DeepFace dumps
-            with QuietStdout():
-                # Trying to recognize each person
-                for detection in detections:
-                    if detection.label == "person":
-                        # Crop bounding box with detected person
-                        bbox = detection.bbox
-                        x, y, w, h = bbox[0], bbox[1], bbox[2], bbox[3]
-
-                        startX = x if x > 0 else 0
-                        startY = y if y > 0 else 0
-                        endX = x + w if x + w < videoWidth else videoWidth
-                        endY = y + h if y + h < videoHeight else videoHeight
-
-                        personCrop = frame[startY:endY, startX:endX]
-
-                        # Feed DeepFace with image of the person and get informations
-                        # that will determine identity of the person
-                        identity, faceDistance, personId, faceId = recognizer.find(
-                            personCrop
-                        )
-                        detection.setIdentity(identity, faceDistance, personId, faceId)
-
-        # Tracking, if set, returns new objects of class Detection
-        if args.tracking == True:
-            detections = tracker.track(frame, detections)
-
-        # Render detections
-        for detection in detections:
-            # If car detection is not set, then skip
-            if detection.label == "car" and args.cars == False:
-                continue
-
-            # Detected class must be among detection classes
-            if detection.label in OBJECTS:
-                # Full frame detection
-                if args.area == None:
-                    draw(frame, detection, videoFPS)
-                    recorder.add(detection, timeStamp)
-
-                # Detection in defined part of frame
-                elif (
-                    detection.center[0] >= args.area[0]
-                    and detection.center[0] <= args.area[2]
-                    and detection.center[1] >= args.area[1]
-                    and detection.center[1] <= args.area[3]
-                ):
-                    draw(frame, detection, videoFPS)
-                    recorder.add(detection, timeStamp)
-
-        # Render detection area in frame, if set
-        if args.frame == True and args.area != None:
-            cv2.rectangle(
-                frame,
-                (args.area[0], args.area[1]),
-                (args.area[2], args.area[3]),
-                (27, 26, 222),
-                2,
-            )
-
-        # Plot counters on frame, if set
-        if args.tracking == True and args.counter == True:
-            currentObjects = 0
-            for detection in detections:
-                # Skip cars if not set
-                if detection.label == "car" and args.cars == False:
+    # Durations of stages are measured only if requested
+    profiler.reset(args.profile)
+
+    progress = Progress(frameCnt)
+    progress.start()
+
+    # Detection is skipped on some frames only if the objects are tracked
+    detectEvery = args.detect_every if args.tracking == True else 1
+    frameIndex = 0
+    lastDetectionIndex = None
+
+    # Frames without motion are not analyzed, objects from the last analyzed frame are kept
+    motionDetector = None
+    if args.motion == True:
+        motionDetector = MotionDetector(args.motion_threshold, args.motion_refresh)
+    lastDetections = []
+
+    def readStage():
+        nonlocal frameIndex, lastDetectionIndex
+        batch = []
+
+        while len(batch) < args.batch_size:
+            with profiler.measure("decode"):
+                ret, frame = video.read()
+
+            # Frame availability check
+            if not ret:
+                break
+
+            frameNum = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+            timeStamp = int(frameNum / videoFPS)
+            index = frameIndex
+            frameIndex += 1
+
+            # Motion is detected in the same region as objects
+            if motionDetector != None:
+                with profiler.measure("motion"):
+                    region = detectionRegion(frame)
+                    if region != None:
+                        x1, y1, x2, y2 = region
+                        static = motionDetector.isStatic(frame[y1:y2, x1:x2])
+                    else:
+                        static = motionDetector.isStatic(frame)
+
+                if static == True:
+                    batch.append((frame, timeStamp, None))
                     continue
 
-                if detection.label in OBJECTS:
-                    # Counting all objects
-                    if args.area == None:
-                        objectIDs.add(detection.trackId)
-                        currentObjects += 1
-
-                    # Counting objects in defined area
-                    elif (
-                        detection.center[0] >= args.area[0]
-                        and detection.center[0] <= args.area[2]
-                        and detection.center[1] >= args.area[1]
-                        and detection.center[1] <= args.area[3]
-                    ):
-                        objectIDs.add(detection.trackId)
-                        currentObjects += 1
-
-            cv2.putText(
-                frame,
-                f"Objects: {currentObjects}",
-                (20, videoHeight - 70),
-                textFont,
-                0.6,
-                (255, 255, 255),
-                1,
-            )
-            cv2.putText(
-                frame,
-                f"Total: {len(objectIDs)}",
-                (20, videoHeight - 50),
-                textFont,
-                0.6,
-                (255, 255, 255),
-                1,
-            )
-
-        # Write current time of the video on frame, if set
-        if args.timestamp == True:
-            cv2.putText(
-                frame,
-                f"{datetime.timedelta(seconds=timeStamp)}",
-                (20, videoHeight - 20),
-                textFont,
-                0.7,
-                (255, 255, 255),
-                1,
+            # Steps are counted in frames including static ones, detection runs on the first
+            # analyzed frame after detectEvery frames
+            if lastDetectionIndex == None or index - lastDetectionIndex >= detectEvery:
+                lastDetectionIndex = index
+            batch.append((frame, timeStamp, index - lastDetectionIndex))
+
+        return batch if len(batch) > 0 else None
+
+    def analyzeStage(batch):
+        nonlocal lastDetections
+        analyzed = [(frame, step) for frame, _, step in batch if step != None]
+        results = iter(
+            analyze(
+                [frame for frame, _ in analyzed],
+                [step for _, step in analyzed],
+                detector,
+                recognizer,
+                tracker,
+                scheduler,
             )
+        )
 
-        # Displaying images during processing, used for debugging
-        # cv2.imshow("Detection of Violators", frame)
-        outputVideo.write(frame)
-
-        # if cv2.waitKey(2) & 0xFF == ord("q"):
-        #     break
-
-    print("Progress: 100 %", flush=True)
+        # Static frames (step is None) reuse detections of the last analyzed frame
+        output = []
+        for item in batch:
+            if item[2] != None:
+                lastDetections = next(results)
+            output.append((item, lastDetections))
+
+        return output
+
+    def renderStage(results):
+        for (frame, timeStamp, _), detections in results:
+            # Show progress every 5%, measured durations are shown along with it
+            if progress.step() == True:
+                profiler.report()
+
+            with profiler.measure("draw"):
+                render(frame, detections, timeStamp, recorder, objectIDs, videoFPS)
+
+            # Displaying images during processing, used for debugging
+            # cv2.imshow("Detection of Violators", frame)
+            with profiler.measure("write"):
+                outputVideo.write(frame)
+            profiler.addFrame()
+
+            # if cv2.waitKey(2) & 0xFF == ord("q"):
+            #     break
+
+    if args.pipeline == True:
+        # Decoding, analysis and encoding of frames run concurrently
+        Pipeline(readStage, analyzeStage, renderStage, args.queue_size).run()
+    else:
+        while True:
+            item = readStage()
+            if item is None:
+                break
+            renderStage(analyzeStage(item))
+
+    progress.finish()
     video.release()
+    outputVideo.release()
     # cv2.destroyAllWindows()
 
     # Summary of detections is stored into JSON file (same directory as video file)
@@ -349,6 +585,16 @@ def main():
     with open(args.output + ".json", "w") as f:
         f.write(summaryData)
 
+    # Measured durations of stages are stored next to the summary
+    profiler.report()
+    profiler.save(args.output + ".profile.json")
+
+
+def main():
+    global args
+    args = argumentParser()
+    process(Models())
+
 
 if __name__ == "__main__":
     main()
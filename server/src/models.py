@@ -0,0 +1,107 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import os
+
+from deepface.basemodels import Facenet
+
+from detector import Detector
+from recognizer import Recognizer
+from tracker import Tracker
+
+
+class Models:
+    """
+    Class keeps loaded models, so that consecutive jobs processed by the same process
+    do not have to load them again. Only the models are shared, every job gets
+    its own objects with their own state.
+    """
+
+    def __init__(self):
+        self.networks = (
+            {}
+        )  # (model, weights, backend, threads, precision) => loaded network
+        self.recognitionModels = {}
+        self.encoder = None
+
+    def preload(self):
+        """
+        Function loads in advance the models that do not depend on parameters of a job.
+        """
+
+        self.getTracker()
+        if "Facenet" not in self.recognitionModels:
+            self.recognitionModels["Facenet"] = Facenet.loadModel()
+
+    def getDetector(
+        self,
+        classNames,
+        modelName,
+        weights,
+        classAwareNMS=False,
+        tileSize=None,
+        tileOverlap=0.2,
+        adaptiveTiles=False,
+        backend="opencv",
+        threads=0,
+        precision="fp32",
+        classes=None,
+    ):
+        """
+        Function returns a new detector created with the given parameters, see Detector.
+        Only the network is shared, settings of post-processing belong to the job.
+        """
+
+        # Forget networks with weights that no longer exist (uploaded for a finished job)
+        self.networks = {
+            key: network
+            for key, network in self.networks.items()
+            if os.path.exists(key[1])
+        }
+
+        key = (modelName, weights, backend, threads, precision)
+        detector = Detector(
+            classNames,
+            modelName,
+            weights,
+            classAwareNMS,
+            tileSize,
+            tileOverlap,
+            adaptiveTiles,
+            backend,
+            threads,
+            precision,
+            classes,
+            self.networks.get(key),
+        )
+        # Backend is reported only when the network was really loaded
+        if key not in self.networks:
+            print(f"Backend: {backend} ({precision})")
+        self.networks[key] = detector.backend
+
+        return detector
+
+    def getRecognizer(self, database, modelName="Facenet"):
+        """
+        Function returns a recognizer of faces in the given database, see Recognizer.
+        """
+
+        recognizer = Recognizer(
+            database, modelName, self.recognitionModels.get(modelName)
+        )
+        self.recognitionModels[modelName] = recognizer.model
+
+        return recognizer
+
+    def getTracker(self, nnBudget=100, detectEvery=1):
+        """
+        Function returns a new tracker, see Tracker.
+        """
+
+        tracker = Tracker(self.encoder, nnBudget, detectEvery)
+        self.encoder = tracker.encoder
+
+        return tracker
@@ -0,0 +1,73 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    Class detects motion in video by differencing of downscaled grayscale frames. Each frame
+    is compared with the last frame with motion, so that slow changes accumulate until they
+    are detected too. Static frames do not have to be analyzed again.
+
+    Parameters:
+    threshold: Minimum fraction of changed pixels considered as motion.
+    refresh: Maximum number of consecutive static frames, the next frame is reported as moving.
+    width: Width of downscaled frames (default: 160).
+    pixelThreshold: Minimum difference of intensity of a changed pixel (default: 25).
+    """
+
+    def __init__(self, threshold, refresh, width=160, pixelThreshold=25):
+        self.threshold = threshold
+        self.refresh = refresh
+        self.width = width
+        self.pixelThreshold = pixelThreshold
+        self.reference = None  # Downscaled last frame with motion
+        self.staticFrames = 0
+
+    def preprocess(self, frame):
+        """
+        Function converts the frame into downscaled and blurred grayscale image.
+
+        Parameters:
+        frame: Frame in BGR format.
+
+        Returns:
+        image: Preprocessed image.
+        """
+
+        height, width = frame.shape[:2]
+        size = (self.width, max(int(height * self.width / width), 1))
+        image = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # Blur suppresses noise of the camera and compression artifacts
+        return cv2.GaussianBlur(image, (5, 5), 0)
+
+    def isStatic(self, frame):
+        """
+        Function checks whether the frame changed since the last frame with motion.
+
+        Parameters:
+        frame: Frame in BGR format.
+
+        Returns:
+        static: True if the frame can be skipped.
+        """
+
+        image = self.preprocess(frame)
+
+        if self.reference is not None and self.staticFrames < self.refresh:
+            difference = cv2.absdiff(image, self.reference)
+            changed = np.count_nonzero(difference > self.pixelThreshold)
+            if changed < self.threshold * difference.size:
+                self.staticFrames += 1
+                return True
+
+        self.reference = image
+        self.staticFrames = 0
+        return False
@@ -0,0 +1,130 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import queue
+import threading
+
+
+class Pipeline:
+    """
+    Class runs video processing in three stages connected by bounded queues, so that decoding,
+    analysis and encoding of different frames overlap in time. Every stage is processed by a single
+    thread, therefore the order of frames is preserved.
+
+    Parameters:
+    read: Function returning the next item for processing or None at the end of the video.
+    analyze: Function processing one item (detection, recognition, tracking), returns its result.
+    render: Function consuming results of the analysis in the original order (drawing, writing).
+    queueSize: Maximum number of items waiting between two stages (default: 8).
+    """
+
+    def __init__(self, read, analyze, render, queueSize=8):
+        self.read = read
+        self.analyze = analyze
+        self.render = render
+
+        self.inputQueue = queue.Queue(maxsize=queueSize)
+        self.outputQueue = queue.Queue(maxsize=queueSize)
+        self.stopEvent = threading.Event()
+        self.error = None
+
+        self.endMark = object()  # Marks the end of the stream in queues
+        # Interval for checking the stop event while blocked on a queue
+        self.timeout = 0.1
+
+    def put(self, targetQueue, item):
+        """
+        Function inserts the item into the queue, waits while the queue is full (backpressure).
+
+        Returns:
+        success: False if the pipeline was stopped in the meantime.
+        """
+
+        while not self.stopEvent.is_set():
+            try:
+                targetQueue.put(item, timeout=self.timeout)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, sourceQueue):
+        """
+        Function takes an item from the queue, waits while the queue is empty.
+
+        Returns:
+        item: Item from the queue or the end mark if the pipeline was stopped in the meantime.
+        """
+
+        while not self.stopEvent.is_set():
+            try:
+                return sourceQueue.get(timeout=self.timeout)
+            except queue.Empty:
+                pass
+        return self.endMark
+
+    def fail(self, error):
+        """
+        Function stores the first error raised in any stage and stops the pipeline.
+        """
+
+        if self.error is None:
+            self.error = error
+        self.stopEvent.set()
+
+    def readStage(self):
+        try:
+            while True:
+                item = self.read()
+                if item is None:
+                    break
+                if not self.put(self.inputQueue, item):
+                    return
+        except BaseException as error:
+            self.fail(error)
+        finally:
+            self.put(self.inputQueue, self.endMark)
+
+    def renderStage(self):
+        try:
+            while True:
+                result = self.get(self.outputQueue)
+                if result is self.endMark:
+                    break
+                self.render(result)
+        except BaseException as error:
+            self.fail(error)
+
+    def run(self):
+        """
+        Function processes the whole video, analysis runs in the calling thread.
+        Any error raised in one of the stages is raised again once all stages have stopped.
+        """
+
+        reader = threading.Thread(target=self.readStage, name="reader", daemon=True)
+        renderer = threading.Thread(
+            target=self.renderStage, name="renderer", daemon=True
+        )
+        reader.start()
+        renderer.start()
+
+        try:
+            while True:
+                item = self.get(self.inputQueue)
+                if item is self.endMark:
+                    break
+                if not self.put(self.outputQueue, self.analyze(item)):
+                    break
+        except BaseException as error:
+            self.fail(error)
+        finally:
+            self.put(self.outputQueue, self.endMark)
+            renderer.join()
+            self.stopEvent.set()  # Release the reader if it is blocked on a full queue
+            reader.join()
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,56 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import cv2
+import numpy as np
+
+
+class Preprocessor:
+    """
+    Class converts frames to the input blob of the network in the same way as
+    cv2.dnn.blobFromImages, but into buffers which are allocated once and reused for
+    all frames. The blob buffer grows with the largest number of images seen.
+
+    Parameters:
+    inputShape: Size of the square input of the network.
+    """
+
+    def __init__(self, inputShape):
+        self.inputShape = inputShape
+        self.scale = np.float32(1 / 255)
+        self.resized = np.empty((inputShape, inputShape, 3), np.uint8)
+        self.blob = np.empty((0, 3, inputShape, inputShape), np.float32)
+
+    def blobFromImages(self, images):
+        """
+        Function resizes images to the input of the network, scales their values to <0, 1>
+        and stacks them in RGB order along the batch dimension. The returned blob is
+        a view of the buffer, so it is valid only until the next call.
+
+        Parameters:
+        images: BGR images to be converted.
+
+        Returns:
+        blob: Images in NCHW format.
+        """
+
+        if len(self.blob) < len(images):
+            self.blob = np.empty(
+                (len(images), 3, self.inputShape, self.inputShape), np.float32
+            )
+
+        blob = self.blob[: len(images)]
+        for image, planes in zip(images, blob):
+            cv2.resize(image, (self.inputShape, self.inputShape), dst=self.resized)
+            # Channels are reversed from BGR to RGB while the planes are filled
+            np.multiply(
+                self.resized.transpose(2, 0, 1)[::-1],
+                self.scale,
+                out=planes,
+                casting="unsafe",
+            )
+
+        return blob
@@ -0,0 +1,128 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import json
+import time
+import threading
+import contextlib
+import numpy as np
+
+
+class Profiler:
+    """
+    Class measures duration of individual processing stages. Measuring is disabled by default,
+    so that the stages can be measured anywhere without slowing down the processing.
+    Durations are aggregated at the end into percentiles per stage.
+    """
+
+    def __init__(self):
+        self.reset(False)
+
+    def reset(self, enabled):
+        """
+        Function discards all measurements and starts measuring again.
+
+        Parameters:
+        enabled: Set to measure duration of stages.
+        """
+
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.durations = {}  # Stage => list of durations in seconds
+        self.frames = 0
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def measureEnabled(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.durations.setdefault(stage, []).append(duration)
+
+    def measure(self, stage):
+        """
+        Function returns context manager measuring duration of its block as the given stage.
+
+        Parameters:
+        stage: Name of the stage, substages are separated by a dot (e.g. "detect.forward").
+        """
+
+        if self.enabled == False:
+            return contextlib.nullcontext()
+
+        return self.measureEnabled(stage)
+
+    def addFrame(self):
+        """
+        Function counts a processed frame, used to calculate FPS.
+        """
+
+        if self.enabled == True:
+            with self.lock:
+                self.frames += 1
+
+    def summary(self):
+        """
+        Function aggregates measured durations.
+
+        Returns:
+        summary: Number of frames, elapsed time, FPS and for each stage number of measurements,
+        total time in seconds and mean and percentiles (p50, p95, p99) of durations in milliseconds.
+        """
+
+        with self.lock:
+            durations = {
+                stage: list(values) for stage, values in self.durations.items()
+            }
+            frames = self.frames
+
+        elapsed = time.perf_counter() - self.start
+        stages = {}
+        for stage, values in sorted(durations.items()):
+            values = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[stage] = {
+                "count": len(values),
+                "total": round(float(values.sum()) / 1000, 3),
+                "mean": round(float(values.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+            }
+
+        return {
+            "frames": frames,
+            "seconds": round(elapsed, 3),
+            "fps": round(frames / elapsed, 3) if elapsed > 0 else 0,
+            "stages": stages,
+        }
+
+    def report(self):
+        """
+        Function prints the current summary on one line, next to the progress of processing.
+        """
+
+        if self.enabled == True:
+            print("Profile: " + json.dumps(self.summary()), flush=True)
+
+    def save(self, path):
+        """
+        Function stores the summary into JSON file.
+
+        Parameters:
+        path: Path to the output file.
+        """
+
+        if self.enabled == True:
+            with open(path, "w") as f:
+                f.write(json.dumps(self.summary(), indent=2))
+
+
+# Profiler shared by all modules
+profiler = Profiler()
@@ -0,0 +1,53 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+
+class Progress:
+    """
+    Class reports progress of video processing to stdout, from where it is read by the server.
+
+    Parameters:
+    frameCnt: Total number of frames in the video.
+    """
+
+    def __init__(self, frameCnt):
+        self.sendLimit = frameCnt // 20
+        self.sentProgress = 1
+        self.progressFrame = 0
+
+    def start(self):
+        """
+        Function reports the beginning of processing.
+        """
+
+        print("Progress: 0 %", flush=True)
+
+    def step(self):
+        """
+        Function is called once per processed frame and shows progress every 5%.
+
+        Returns:
+        shown: True if the progress was shown.
+        """
+
+        shown = False
+        if self.progressFrame == self.sendLimit:
+            print(
+                "Progress: " + str(min(self.sentProgress * 5, 100)) + " %", flush=True
+            )
+            self.sentProgress += 1
+            self.progressFrame = 0
+            shown = True
+        self.progressFrame += 1
+
+        return shown
+
+    def finish(self):
+        """
+        Function reports the end of processing.
+        """
+
+        print("Progress: 100 %", flush=True)
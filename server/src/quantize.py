@@ -0,0 +1,374 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import os
+import sys
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+from detector import Detector
+from preprocessor import Preprocessor
+from detectionModels import MODELS
+from darknetOnnx import convertDarknet, modelPath
+
+samplesDir = os.path.join("..", "..", "samples")
+
+
+def readFrames(samples, count):
+    """
+    Function reads frames spread evenly over the sample videos.
+
+    Parameters:
+    samples: Paths to the sample videos.
+    count: Number of frames read from each video.
+
+    Returns:
+    frames: Read frames.
+    """
+
+    frames = []
+    for sample in samples:
+        video = cv2.VideoCapture(sample)
+        if not video.isOpened():
+            sys.stderr.write(f"Failed to open the video {sample}.\n")
+            continue
+
+        # Frames are read sequentially, seeking is not reliable with all codecs
+        step = max(int(video.get(cv2.CAP_PROP_FRAME_COUNT)) // count, 1)
+        index, read = 0, 0
+        while read < count:
+            ret, frame = video.read()
+            if not ret:
+                break
+
+            if index % step == 0:
+                frames.append(frame)
+                read += 1
+            index += 1
+
+        video.release()
+
+    return frames
+
+
+def createBlobs(frames, inputShape, batchSize):
+    """
+    Function converts frames to blobs by the same preprocessing as the detector.
+
+    Parameters:
+    frames: Frames to be converted.
+    inputShape: Size of the network input.
+    batchSize: Number of frames in one blob.
+
+    Returns:
+    blobs: Generator of blobs.
+    """
+
+    preprocessor = Preprocessor(inputShape)
+    for i in range(0, len(frames), batchSize):
+        # Buffer of the preprocessor is reused, the calibration may keep the blob
+        yield preprocessor.blobFromImages(frames[i : i + batchSize]).copy()
+
+
+def quantize(config, weights, frames, inputShape, batchSize):
+    """
+    Function creates INT8 model of the network by static quantization. Ranges of activations
+    are calibrated on the given frames.
+
+    Parameters:
+    config: Path to the Darknet configuration file.
+    weights: Path to the Darknet weights file.
+    frames: Calibration frames.
+    inputShape: Size of the network input.
+    batchSize: Number of frames in one calibration step.
+
+    Returns:
+    path: Path to the quantized model.
+    """
+
+    try:
+        import onnx
+        from onnxruntime.quantization import (
+            CalibrationDataReader,
+            QuantFormat,
+            QuantType,
+            quantize_static,
+        )
+    except ImportError:
+        sys.stderr.write("Quantization requires the onnx and onnxruntime packages.\n")
+        exit(1)
+
+    source = convertDarknet(config, weights)
+    inputName = onnx.load(source).graph.input[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.blobs = createBlobs(frames, inputShape, batchSize)
+
+        def get_next(self):
+            blob = next(self.blobs, None)
+            return None if blob is None else {inputName: blob}
+
+    path = modelPath(config, weights, "int8")
+
+    # Weights are quantized per channel, quantized operators are stored as QDQ pairs
+    # which are supported by both ONNX Runtime and OpenVINO
+    temporary = f"{path}.{os.getpid()}"
+    quantize_static(
+        source,
+        temporary,
+        FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    os.replace(temporary, path)
+
+    return path
+
+
+def iou(bbox, bboxes):
+    """
+    Function computes intersection over union of the box with other boxes.
+
+    Parameters:
+    bbox: Bounding box in format [x, y, w, h].
+    bboxes: Array of bounding boxes in format [x, y, w, h].
+
+    Returns:
+    iou: Array with intersection over union for each box.
+    """
+
+    x1 = np.maximum(bbox[0], bboxes[:, 0])
+    y1 = np.maximum(bbox[1], bboxes[:, 1])
+    x2 = np.minimum(bbox[0] + bbox[2], bboxes[:, 0] + bboxes[:, 2])
+    y2 = np.minimum(bbox[1] + bbox[3], bboxes[:, 1] + bboxes[:, 3])
+    intersection = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    union = bbox[2] * bbox[3] + bboxes[:, 2] * bboxes[:, 3] - intersection
+
+    return intersection / np.maximum(union, 1)
+
+
+def evaluate(reference, quantized, frames, batchSize, iouThreshold=0.5):
+    """
+    Function compares detections of the quantized model with detections of the full precision
+    model, which are taken as the ground truth.
+
+    Parameters:
+    reference: Detector with the full precision model.
+    quantized: Detector with the quantized model.
+    frames: Evaluation frames.
+    batchSize: Number of frames processed at once.
+    iouThreshold: Minimum IoU of matching detections of the same class (default: 0.5).
+
+    Returns:
+    report: Precision, recall, mean IoU and mean confidence difference of the quantized model
+    and FPS of both models.
+    """
+
+    counts = {"reference": 0, "quantized": 0, "matched": 0}
+    ious, confDiffs = [], []
+    seconds = {"reference": 0, "quantized": 0}
+
+    for i in range(0, len(frames), batchSize):
+        batch = frames[i : i + batchSize]
+
+        start = time.perf_counter()
+        expected = reference.predictBatch(batch)
+        seconds["reference"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        predicted = quantized.predictBatch(batch)
+        seconds["quantized"] += time.perf_counter() - start
+
+        for (labels, confs, bboxes), (qLabels, qConfs, qBboxes) in zip(
+            expected, predicted
+        ):
+            counts["reference"] += len(labels)
+            counts["quantized"] += len(qLabels)
+            qBboxes = np.array(qBboxes, dtype=np.float64).reshape(-1, 4)
+            unmatched = np.ones(len(qLabels), dtype=bool)
+
+            # Greedy matching from the most confident reference detection
+            for j in np.argsort(confs)[::-1]:
+                candidates = unmatched & (np.array(qLabels) == labels[j])
+                if not candidates.any():
+                    continue
+
+                overlaps = np.where(candidates, iou(bboxes[j], qBboxes), 0)
+                k = int(np.argmax(overlaps))
+                if overlaps[k] >= iouThreshold:
+                    unmatched[k] = False
+                    counts["matched"] += 1
+                    ious.append(overlaps[k])
+                    confDiffs.append(abs(confs[j] - qConfs[k]))
+
+    return {
+        "frames": len(frames),
+        "detections": counts,
+        "precision": round(counts["matched"] / max(counts["quantized"], 1), 4),
+        "recall": round(counts["matched"] / max(counts["reference"], 1), 4),
+        "meanIoU": round(float(np.mean(ious)) if len(ious) > 0 else 0, 4),
+        "meanConfDiff": round(
+            float(np.mean(confDiffs)) if len(confDiffs) > 0 else 0, 4
+        ),
+        "fps": {
+            name: round(len(frames) / value, 2) if value > 0 else 0
+            for name, value in seconds.items()
+        },
+    }
+
+
+def argumentParser(argv=None):
+    """
+    Function parses arguments of the quantization.
+
+    Returns:
+    args: Parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Quantization of the detection model to INT8 precision."
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        default="yolo320",
+        choices=list(MODELS.keys()),
+        required=False,
+        metavar="MODEL",
+        help="Defines a model for object detection: "
+        + ", ".join(MODELS.keys())
+        + ". (default: yolo320)",
+    )
+    parser.add_argument(
+        "-w",
+        "--weights",
+        required=False,
+        metavar="PATH",
+        help="Path to weights of the model. (default: Default pretrained weights of the model)",
+    )
+    parser.add_argument(
+        "--samples",
+        nargs="+",
+        required=False,
+        metavar="PATH",
+        help="Videos with calibration and evaluation frames. (default: all videos in the samples directory)",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=50,
+        required=False,
+        metavar="INTEGER",
+        help="Number of calibration frames and evaluation frames from each video. (default: 50)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        required=False,
+        metavar="INTEGER",
+        help="Number of frames processed at once. (default: 8)",
+    )
+    parser.add_argument(
+        "--backend",
+        default="onnxruntime",
+        choices=["onnxruntime", "openvino"],
+        required=False,
+        metavar="BACKEND",
+        help="Defines a backend used for evaluation: onnxruntime or openvino. (default: onnxruntime)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        required=False,
+        metavar="INTEGER",
+        help="Number of threads of the backend, 0 for the default of the backend. (default: 0)",
+    )
+
+    parser = parser.parse_args(argv)
+
+    if parser.weights == None:
+        parser.weights = MODELS[parser.model]["weights"]
+
+    if os.path.exists(parser.weights) == False:
+        sys.stderr.write("File with weights of the model does not exist.\n")
+        exit(1)
+
+    if parser.frames < 1 or parser.batch_size < 1:
+        sys.stderr.write("Number of frames and batch size must be positive numbers.\n")
+        exit(1)
+
+    if parser.samples == None:
+        parser.samples = sorted(
+            os.path.join(samplesDir, f)
+            for f in os.listdir(samplesDir)
+            if f.endswith(".mp4")
+        )
+
+    return parser
+
+
+def main():
+    """
+    Quantization creates INT8 model of the detection network, which is used by main.py
+    with '--precision int8'. Ranges of activations are calibrated on frames of the sample
+    videos, the quantized model is then evaluated against the full precision model on other
+    frames of the same videos. The report is printed and stored next to the model.
+    """
+
+    args = argumentParser()
+
+    with open(MODELS[args.model]["labels"]) as f:
+        classNames = f.read().rstrip("\n").split("\n")
+
+    # Calibration and evaluation frames alternate
+    frames = readFrames(args.samples, args.frames * 2)
+    if len(frames) < 2:
+        sys.stderr.write("Failed to read frames from the sample videos.\n")
+        exit(1)
+    calibrationFrames, evaluationFrames = frames[0::2], frames[1::2]
+
+    def createDetector(precision):
+        return Detector(
+            classNames,
+            args.model,
+            args.weights,
+            backend=args.backend,
+            threads=args.threads,
+            precision=precision,
+        )
+
+    # Full precision model is converted first, quantized model is created from it
+    reference = createDetector("fp32")
+    path = quantize(
+        reference.config,
+        args.weights,
+        calibrationFrames,
+        reference.inputShape,
+        args.batch_size,
+    )
+    print(f"Quantized model: {path}")
+
+    report = evaluate(
+        reference, createDetector("int8"), evaluationFrames, args.batch_size
+    )
+    report["backend"] = args.backend
+    report["model"] = args.model
+
+    print(json.dumps(report, indent=2))
+    with open(path + ".json", "w") as f:
+        f.write(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
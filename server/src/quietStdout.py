@@ -6,17 +6,59 @@
 
 import sys
 import os
+import threading
+
+
+class ThreadStdout:
+    """
+    Class replaces stdout, so that output of single threads can be discarded. Output
+    of other threads is written to the original stdout.
+
+    Parameters:
+    stream: Original stdout.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.devnull = open(os.devnull, "w")
+        self.local = threading.local()
+
+    def target(self):
+        """
+        Function returns the stream for output of the current thread.
+        """
+
+        if getattr(self.local, "depth", 0) > 0:
+            return self.devnull
+        return self.stream
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        return self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
 
 # Source: https://stackoverflow.com/questions/8391411/how-to-block-calls-to-print
 class QuietStdout:
     """
     Class is used to temporarily redirect stdout to devnull to eliminate junk dumps.
+    Only output of the current thread is redirected, other threads (e.g. rendering
+    thread of the pipeline printing the progress) keep writing to stdout.
     """
 
+    lock = threading.Lock()
+
     def __enter__(self):
-        self.originalStdout = sys.stdout
-        sys.stdout = open(os.devnull, "w")
+        # Stdout is replaced only once and never restored, other threads may use it
+        with QuietStdout.lock:
+            if not isinstance(sys.stdout, ThreadStdout):
+                sys.stdout = ThreadStdout(sys.stdout)
+        self.stdout = sys.stdout
+        self.stdout.local.depth = getattr(self.stdout.local, "depth", 0) + 1
 
     def __exit__(self, excType, excVal, excTb):
-        sys.stdout.close()
-        sys.stdout = self.originalStdout
+        self.stdout.local.depth -= 1
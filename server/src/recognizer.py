@@ -4,33 +4,144 @@
 # Brno University of Technology
 # 2022
 
+import os
 import sys
+import numpy as np
 from deepface import DeepFace
 from deepface.basemodels import Facenet, VGGFace
+from deepface.commons import distance as dst
 
 
 class Recognizer:
     """
     Class represents a recognizer that is used to recognize people by their face.
+    Face images from the database are embedded once during initialization, embeddings
+    are cached in the database directory and reused as long as the images do not change.
 
     Parameters:
     db_path: Path to the directory with face images.
     modelName: Name of recognition model to be used (default: Facenet).
+    model: Already loaded recognition model of the given name, if any.
     """
 
-    def __init__(self, db_path, modelName="Facenet"):
+    def __init__(self, db_path, modelName="Facenet", model=None):
         self.database = db_path
-        self.modelName = modelName
-        self.model = None
+        self.modelName = modelName if modelName == "Facenet" else "VGG-Face"
+        self.model = model
 
-        if modelName == "Facenet":
-            self.model = Facenet.loadModel()
-        else:
-            self.modelName = "VGG-Face"
-            self.model = VGGFace.loadModel()
+        if self.model is None:
+            if self.modelName == "Facenet":
+                self.model = Facenet.loadModel()
+            else:
+                self.model = VGGFace.loadModel()
+
+        self.threshold = dst.findThreshold(self.modelName, "cosine")
+        self.cacheFile = os.path.join(
+            self.database, f"embeddings_{self.modelName.lower()}.npz"
+        )
+
+        # Paths to face images and matrix of their normalized embeddings (one per row)
+        self.identities = []
+        self.embeddings = None
+        self.loadDatabase()
 
         print(f"Recognizer: {self.modelName}")
 
+    def represent(self, image):
+        """
+        Function computes embedding of the face in the given image.
+
+        Parameters:
+        image: Path to the image or the image itself.
+
+        Returns:
+        embedding: Embedding of the face.
+        """
+
+        return np.asarray(
+            DeepFace.represent(
+                image,
+                model_name=self.modelName,
+                model=self.model,
+                enforce_detection=False,
+            ),
+            dtype=np.float64,
+        )
+
+    def loadDatabase(self):
+        """
+        Function builds index of embeddings of all face images in the database.
+        Embeddings are taken from the cache file if the image was not modified since.
+        """
+
+        # Cache is stored as plain arrays, it must not execute any code when loaded
+        cache = {}
+        if os.path.exists(self.cacheFile):
+            try:
+                with np.load(self.cacheFile, allow_pickle=False) as data:
+                    for key, mtime, size, embedding in zip(
+                        data["files"], data["mtimes"], data["sizes"], data["embeddings"]
+                    ):
+                        cache[str(key)] = (int(mtime), int(size), embedding)
+            except Exception:
+                sys.stderr.write("Failed to load cache of face embeddings.\n")
+
+        # Same image formats as DeepFace
+        images = []
+        for root, _, files in os.walk(self.database):
+            for file in sorted(files):
+                if (".jpg" in file.lower()) or (".png" in file.lower()):
+                    images.append(os.path.join(root, file))
+
+        entries = {}
+        embeddings = []
+        modified = False
+        for image in images:
+            stat = os.stat(image)
+            key = os.path.relpath(image, self.database)
+            entry = cache.get(key)
+
+            # Image is new or was modified => compute its embedding again
+            if (
+                entry is None
+                or entry[0] != stat.st_mtime_ns
+                or entry[1] != stat.st_size
+            ):
+                try:
+                    entry = (stat.st_mtime_ns, stat.st_size, self.represent(image))
+                    modified = True
+                except Exception:
+                    sys.stderr.write(f"Failed to represent face image: {image}\n")
+                    continue
+
+            entries[key] = entry
+            self.identities.append(image)
+            embeddings.append(entry[2])
+
+        # Store cache only if some image was added, modified or removed
+        if modified or entries.keys() != cache.keys():
+            try:
+                with open(self.cacheFile, "wb") as f:
+                    np.savez(
+                        f,
+                        files=np.array(list(entries.keys()), dtype=str),
+                        mtimes=np.array(
+                            [entry[0] for entry in entries.values()], dtype=np.int64
+                        ),
+                        sizes=np.array(
+                            [entry[1] for entry in entries.values()], dtype=np.int64
+                        ),
+                        embeddings=np.array(
+                            [entry[2] for entry in entries.values()], dtype=np.float64
+                        ),
+                    )
+            except OSError:
+                sys.stderr.write("Failed to store cache of face embeddings.\n")
+
+        if len(embeddings) > 0:
+            self.embeddings = np.stack(embeddings)
+            self.embeddings /= np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+
     def find(self, person_bbox):
         """
         Function will try to recognize the person in the input image against the face database.
@@ -50,21 +161,25 @@ class Recognizer:
         personId = ""
         faceId = ""
 
+        if self.embeddings is None:
+            return name, faceDistance, personId, faceId
+
         try:
-            df = DeepFace.find(
-                person_bbox,
-                self.database,
-                model_name=self.modelName,
-                model=self.model,
-                distance_metric="cosine",
-                enforce_detection=False,
-            )
+            embedding = self.represent(person_bbox)
+            embedding /= np.linalg.norm(embedding)
+
+            # Cosine distances to all faces in the database at once
+            distances = 1 - np.dot(self.embeddings, embedding)
+            best = int(np.argmin(distances))
 
-            if df.shape[0] > 0:
-                identity = df.iloc[0].identity
-                faceDistance = df.iloc[0, 1]
+            if distances[best] <= self.threshold:
+                faceDistance = distances[best]
                 identity = (
-                    identity.replace("\\", "/").split("/")[-1].split(".")[0].split("_")
+                    self.identities[best]
+                    .replace("\\", "/")
+                    .split("/")[-1]
+                    .split(".")[0]
+                    .split("_")
                 )
                 name = identity[0] + " " + identity[1]
                 personId = identity[2]
@@ -74,3 +189,27 @@ class Recognizer:
             pass
 
         return name.title(), faceDistance, personId, faceId
+
+    def findInFrame(self, frame, bbox):
+        """
+        Function will try to recognize the person in the given part of the frame.
+
+        Parameters:
+        frame: Frame with the person.
+        bbox: Bounding box of the person in format [x, y, w, h].
+
+        Returns:
+        Same as find.
+        """
+
+        frameHeight, frameWidth, _ = frame.shape
+
+        # Crop bounding box with detected person
+        x, y, w, h = bbox[0], bbox[1], bbox[2], bbox[3]
+
+        startX = x if x > 0 else 0
+        startY = y if y > 0 else 0
+        endX = x + w if x + w < frameWidth else frameWidth
+        endY = y + h if y + h < frameHeight else frameHeight
+
+        return self.find(frame[startY:endY, startX:endX])
@@ -0,0 +1,77 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+from quietStdout import QuietStdout
+
+
+class RecognitionScheduler:
+    """
+    Class plans face recognition of tracked persons. Each track is recognized when it appears
+    and then again only after the given interval, until its identity is confidently matched.
+
+    Parameters:
+    recognizer: Recognizer used for face recognition.
+    interval: Number of analyzed frames between two recognitions of the same track (default: 25).
+    minSize: Minimum width and height of the person in pixels to contain a recognizable face (default: 40).
+    lockDistance: Face distance below which the identity of the track is no longer verified (default: 0.15).
+    """
+
+    def __init__(self, recognizer, interval=25, minSize=40, lockDistance=0.15):
+        self.recognizer = recognizer
+        self.interval = interval
+        self.minSize = minSize
+        self.lockDistance = lockDistance
+
+        self.frameNum = 0
+        # Number of the frame with the last recognition of each track
+        self.lastQuery = {}
+
+    def recognize(self, frame, detections, tracker):
+        """
+        Function recognizes tracked persons whose turn it is, identities are stored into their tracks.
+
+        Parameters:
+        frame: Frame on which the detections were obtained.
+        detections: Detections obtained from the tracker.
+        tracker: Tracker that keeps identities of the tracks.
+        """
+
+        self.frameNum += 1
+
+        # Forget deleted tracks
+        trackIds = tracker.getTrackIds()
+        self.lastQuery = {
+            trackId: frameNum
+            for trackId, frameNum in self.lastQuery.items()
+            if trackId in trackIds
+        }
+
+        # Redirect stdout due to DeepFace dumps
+        with QuietStdout():
+            for detection in detections:
+                if detection.label != "person":
+                    continue
+
+                # Identity is already confident
+                if detection.faceDistance < self.lockDistance:
+                    continue
+
+                # Track was recognized recently
+                lastQuery = self.lastQuery.get(detection.trackId)
+                if lastQuery is not None and self.frameNum - lastQuery < self.interval:
+                    continue
+
+                # Person is too small to recognize the face, try it on the next frame
+                if detection.bbox[2] < self.minSize or detection.bbox[3] < self.minSize:
+                    continue
+
+                self.lastQuery[detection.trackId] = self.frameNum
+                identity, faceDistance, personId, faceId = self.recognizer.findInFrame(
+                    frame, detection.bbox
+                )
+                tracker.updateIdentity(
+                    detection, identity, faceDistance, personId, faceId
+                )
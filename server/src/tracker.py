@@ -9,28 +9,45 @@ from deep_sort import nn_matching
 from deep_sort.tracker import Tracker as DeepSortTracker
 from deep_sort.detection import Detection as DeepSortDetection
 from detection import Detection
-import cv2
+from profiler import profiler
 import random
+import numpy as np
 
 
 class Tracker:
     """
     Class serves as a tracker for object tracking, which is built on DeepSort.
+
+    Parameters:
+    encoder: Already loaded encoder of appearance features, if any.
+    nnBudget: Maximum number of appearance features kept for each track, unlimited if None (default: 100).
+    detectEvery: Number of frames between detection frames, the tracker is updated only on them (default: 1).
     """
 
-    def __init__(self):
+    def __init__(self, encoder=None, nnBudget=100, detectEvery=1):
         self.model = "deep_sort\mars-small128.pb"
-        self.maxAge = 900
+        # Ages are counted in detection frames, lost tracks are kept for 900 frames
+        self.maxAge = max(900 // detectEvery, 1)
+        # Number of detections before a track is confirmed, at least two on sparse detection frames
+        self.nInit = max(int(np.ceil(3 / detectEvery)), 2)
         self.matchingThreshold = 0.7
-        self.nnBudget = None
+        self.nnBudget = nnBudget
         self.timeSinceUpdate = 2  # Number of frames since the last measurement update
+        self.batchSize = 64  # Maximum number of image patches encoded at once
 
-        self.encoder = gdet.create_box_encoder(self.model, batch_size=1)
+        self.encoder = encoder
+        if self.encoder is None:
+            # Frames stay in BGR, only the extracted patches are converted to RGB
+            self.encoder = gdet.create_box_encoder(
+                self.model, batch_size=self.batchSize, swap_rb=True
+            )
         self.metric = nn_matching.NearestNeighborDistanceMetric(
             "cosine", self.matchingThreshold, self.nnBudget
         )
         # Deepsort tracker initialization
-        self.tracker = DeepSortTracker(self.metric, max_age=self.maxAge)
+        self.tracker = DeepSortTracker(
+            self.metric, max_age=self.maxAge, n_init=self.nInit
+        )
         self.colors = [  # [BGR]
             (0, 220, 0),  # Green
             (0, 111, 255),  # Orange
@@ -49,7 +66,27 @@ class Tracker:
 
         return random.choice(self.colors)
 
-    def track(self, frame, inputDetections):
+    def encode(self, frames, detectionsList):
+        """
+        Function computes appearance features of detections from several frames at once.
+
+        Parameters:
+        frames: Frames on which the detections were obtained.
+        detectionsList: Obtained detections for each frame.
+
+        Returns:
+        features: Matrix of feature vectors for each frame.
+        """
+
+        bboxes = [
+            [detection.bbox for detection in detections]
+            for detections in detectionsList
+        ]
+
+        with profiler.measure("track.encode"):
+            return self.encoder.encode_batch(frames, bboxes)
+
+    def track(self, frame, inputDetections, features=None):
         """
         Function perform tracking on input detections and returns the same detections,
         but with supplemented data from previous iterations (possibly updated data).
@@ -57,14 +94,14 @@ class Tracker:
         Parameters:
         frame: Frame on which the current detections were obtained.
         inputDetections: Obtained detections.
+        features: Appearance features of the detections, if already computed by encode.
 
         Returns:
         detections: Supplemented input detections.
         """
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        bboxes = [detection.bbox for detection in inputDetections]
-        features = self.encoder(frame, bboxes)
+        if features is None:
+            features = self.encode([frame], [inputDetections])[0]
 
         # Convert Detection class to the Detection class used by DeepSort
         detections = []
@@ -87,10 +124,70 @@ class Tracker:
             )
 
         # Perform tracking
-        self.tracker.predict()
-        self.tracker.update(detections)
+        with profiler.measure("track.predict"):
+            self.tracker.predict()
+        with profiler.measure("track.update"):
+            self.tracker.update(detections)
+
+        return self.collectDetections()
+
+    def getTrackIds(self):
+        """
+        Function returns IDs of all tracks kept by the tracker.
+        """
+
+        return set(track.track_id for track in self.tracker.tracks)
+
+    def updateIdentity(self, detection, identity, faceDistance, personId, faceId):
+        """
+        Function updates identity of the track of the given detection, if the face matches
+        better than before. The detection then takes over the identity of its track.
+
+        Parameters:
+        detection: Detection obtained from the tracker.
+        identity: Name of the recognized person.
+        faceDistance: Face distance of the recognized person.
+        personId: Person identifier.
+        faceId: Identifier of the face image against which it was recognized.
+        """
+
+        for track in self.tracker.tracks:
+            if track.track_id == detection.trackId:
+                track.update_identity(identity, faceDistance, personId, faceId)
+                detection.setIdentity(
+                    track.get_identity(),
+                    track.get_faceDistance(),
+                    track.get_personId(),
+                    track.get_faceId(),
+                )
+                return
+
+    def interpolate(self, step):
+        """
+        Function returns detections of tracked objects on a frame between two detection frames.
+        Positions are extrapolated by the Kalman filter from the last tracked states, paths
+        are extended by the new positions. States of the Kalman filter are not changed.
+
+        Parameters:
+        step: Time since the last tracked frame as a fraction of the time between detection frames.
+
+        Returns:
+        detections: Detections of tracked objects.
+        """
+
+        return self.collectDetections(step)
+
+    def collectDetections(self, step=0):
+        """
+        Function parses tracks into objects of class Detection.
+
+        Parameters:
+        step: Time since the last tracked frame, see interpolate (default: 0).
+
+        Returns:
+        detections: Detections of tracked objects.
+        """
 
-        # Parse results and return objects of Detection class again
         detections = []
         for track in self.tracker.tracks:
             if (
@@ -99,7 +196,15 @@ class Tracker:
             ):
                 continue
 
-            bbox = track.to_tlwh()
+            if step == 0:
+                bbox = track.to_tlwh()
+            else:
+                bbox = track.extrapolate_tlwh(self.tracker.kf, step)
+                bbox = [int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])]
+                track.trail.append(
+                    [int(bbox[0] + (bbox[2] >> 1)), int(bbox[1] + (bbox[3] >> 1))]
+                )
+
             detections.append(
                 Detection(
                     track.get_label(),
@@ -110,7 +215,7 @@ class Tracker:
                     track.get_personId(),
                     track.get_faceId(),
                     track.track_id,
-                    track.trail,
+                    list(track.trail),  # Copy, the track keeps extending its trail
                     track.bboxColor,
                     track.cornerColor,
                     track.textColor,
@@ -0,0 +1,50 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import sys
+import json
+import traceback
+
+import main as app
+from argParser import argumentParser
+from models import Models
+
+
+def main():
+    """
+    Worker processes jobs received on stdin, one JSON object per line in format
+    {"args": [...]} with the same arguments as main.py. Loaded models are kept
+    between jobs. The end of each job is reported by the line "Finished: <code>".
+    """
+
+    models = Models()
+    models.preload()
+    print("Worker: ready", flush=True)
+
+    for line in sys.stdin:
+        if line.strip() == "":
+            continue
+
+        code = 0
+        try:
+            job = json.loads(line)
+            app.args = argumentParser([str(arg) for arg in job["args"]])
+            app.process(models)
+        except SystemExit as error:
+            # Exit codes of the program (invalid arguments, unreadable video, ...)
+            code = (
+                error.code if isinstance(error.code, int) else int(error.code != None)
+            )
+        except Exception:
+            traceback.print_exc()
+            code = 1
+
+        sys.stderr.flush()
+        print(f"Finished: {code}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from deep_sort import iou_matching, linear_assignment
+
+
+def randomBoxes(rng, count):
+    """
+    Function returns random boxes in format (x, y, w, h) spread over a Full HD frame,
+    integer coordinates make boxes that touch each other.
+    """
+
+    return np.floor(rng.uniform([0, 0, 10, 10], [1800, 1000, 150, 150], (count, 4)))
+
+
+def test_iou_matrix_matches_iou():
+    rng = np.random.default_rng(8)
+    bboxes, candidates = randomBoxes(rng, 40), randomBoxes(rng, 50)
+    # Some candidates overlap the boxes
+    candidates[:20] = bboxes[:20] + rng.integers(-20, 20, (20, 4))
+    candidates[:, 2:] = np.maximum(candidates[:, 2:], 1)
+
+    expected = np.array([iou_matching.iou(bbox, candidates) for bbox in bboxes])
+
+    np.testing.assert_allclose(
+        iou_matching.iou_matrix(bboxes, candidates), expected, rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("count", [0, 1, 30, 300])
+def test_iou_matrix_sweep_matches_iou_matrix(count):
+    rng = np.random.default_rng(count)
+    bboxes, candidates = randomBoxes(rng, count), randomBoxes(rng, count + 5)
+
+    np.testing.assert_array_equal(
+        iou_matching.iou_matrix_sweep(bboxes, candidates),
+        iou_matching.iou_matrix(bboxes, candidates),
+    )
+
+
+@pytest.mark.parametrize("sweep", [False, True])
+def test_iou_cost_matches_per_track(sweep):
+    rng = np.random.default_rng(9)
+    bboxes, candidates = randomBoxes(rng, 25), randomBoxes(rng, 30)
+    candidates[:15] = bboxes[:15] + rng.integers(-10, 10, (15, 4))
+    candidates[:, 2:] = np.maximum(candidates[:, 2:], 1)
+
+    tracks = [
+        SimpleNamespace(
+            to_tlwh=lambda bbox=bbox: bbox.copy(), time_since_update=int(i % 4 == 0) + 1
+        )
+        for i, bbox in enumerate(bboxes)
+    ]
+    detections = [SimpleNamespace(tlwh=candidate) for candidate in candidates]
+    trackIndices = list(range(1, 25))
+    detectionIndices = list(range(0, 30, 2))
+
+    # Original cost of deep_sort, one track after another
+    expected = np.zeros((len(trackIndices), len(detectionIndices)))
+    for row, trackIdx in enumerate(trackIndices):
+        if tracks[trackIdx].time_since_update > 1:
+            expected[row, :] = linear_assignment.INFTY_COST
+            continue
+        expected[row, :] = 1.0 - iou_matching.iou(
+            bboxes[trackIdx], candidates[detectionIndices]
+        )
+
+    result = iou_matching.iou_cost(
+        tracks, detections, trackIndices, detectionIndices, sweep=sweep
+    )
+
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
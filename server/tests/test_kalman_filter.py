@@ -0,0 +1,124 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from deep_sort import kalman_filter, linear_assignment
+
+
+def randomStates(rng, count):
+    """
+    Function returns random state distributions of tracks, each initiated from a random
+    measurement and predicted a few times, so that covariances are not diagonal.
+    """
+
+    kf = kalman_filter.KalmanFilter()
+    means, covariances = [], []
+    for _ in range(count):
+        measurement = rng.uniform([0, 0, 0.3, 20], [1000, 600, 1.0, 200])
+        mean, covariance = kf.initiate(measurement)
+        for _ in range(rng.integers(1, 5)):
+            mean, covariance = kf.predict(mean, covariance)
+            mean[4:] = rng.normal(0, 2, 4)
+        means.append(mean)
+        covariances.append(covariance)
+    return np.array(means), np.array(covariances)
+
+
+def randomMeasurements(rng, count):
+    """
+    Function returns random measurements in format (x, y, a, h).
+    """
+
+    return rng.uniform([0, 0, 0.3, 20], [1000, 600, 1.0, 200], (count, 4))
+
+
+@pytest.mark.parametrize("onlyPosition", [False, True])
+def test_gating_distance_batch_matches_per_track(onlyPosition):
+    rng = np.random.default_rng(1)
+    kf = kalman_filter.KalmanFilter()
+    means, covariances = randomStates(rng, 20)
+    measurements = randomMeasurements(rng, 15)
+
+    expected = np.array(
+        [
+            kf.gating_distance(mean, covariance, measurements, onlyPosition)
+            for mean, covariance in zip(means, covariances)
+        ]
+    )
+    result = kf.gating_distance_batch(means, covariances, measurements, onlyPosition)
+
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+
+def test_gate_cost_matrix_matches_per_track():
+    rng = np.random.default_rng(2)
+    kf = kalman_filter.KalmanFilter()
+    means, covariances = randomStates(rng, 30)
+    # Measurements near the tracks, so that only some pairs are gated
+    measurements = means[rng.integers(0, 30, 25), :4] + rng.normal(
+        0, [5, 5, 0.01, 2], (25, 4)
+    )
+
+    tracks = [
+        SimpleNamespace(mean=mean, covariance=covariance)
+        for mean, covariance in zip(means, covariances)
+    ]
+    detections = [
+        SimpleNamespace(to_xyah=lambda measurement=measurement: measurement)
+        for measurement in measurements
+    ]
+    trackIndices = list(range(0, 30, 2))
+    detectionIndices = list(range(1, 25))
+    costMatrix = rng.random((len(trackIndices), len(detectionIndices)))
+
+    # Original gating of deep_sort, one track after another
+    threshold = kalman_filter.chi2inv95[4]
+    expected = costMatrix.copy()
+    for row, trackIdx in enumerate(trackIndices):
+        distance = kf.gating_distance(
+            means[trackIdx], covariances[trackIdx], measurements[detectionIndices]
+        )
+        expected[row, distance > threshold] = linear_assignment.INFTY_COST
+
+    result = linear_assignment.gate_cost_matrix(
+        kf, costMatrix.copy(), tracks, detections, trackIndices, detectionIndices
+    )
+
+    assert np.any(expected == linear_assignment.INFTY_COST)
+    assert np.any(expected != linear_assignment.INFTY_COST)
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_predict_batch_matches_predict():
+    rng = np.random.default_rng(3)
+    kf = kalman_filter.KalmanFilter()
+    means, covariances = randomStates(rng, 20)
+
+    result = kf.predict_batch(means.copy(), covariances.copy())
+
+    for i, (mean, covariance) in enumerate(zip(means, covariances)):
+        expectedMean, expectedCovariance = kf.predict(mean, covariance)
+        np.testing.assert_allclose(result[0][i], expectedMean, rtol=1e-12)
+        np.testing.assert_allclose(result[1][i], expectedCovariance, rtol=1e-12)
+
+
+def test_update_batch_matches_update():
+    rng = np.random.default_rng(4)
+    kf = kalman_filter.KalmanFilter()
+    means, covariances = randomStates(rng, 20)
+    measurements = means[:, :4] + rng.normal(0, [5, 5, 0.01, 2], (20, 4))
+
+    result = kf.update_batch(means.copy(), covariances.copy(), measurements)
+
+    for i, (mean, covariance) in enumerate(zip(means, covariances)):
+        expectedMean, expectedCovariance = kf.update(mean, covariance, measurements[i])
+        np.testing.assert_allclose(result[0][i], expectedMean, rtol=1e-9)
+        np.testing.assert_allclose(
+            result[1][i], expectedCovariance, rtol=1e-9, atol=1e-9
+        )
@@ -0,0 +1,88 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+from deep_sort import linear_assignment
+
+
+def referenceMinCostMatching(costMatrix, maxDistance):
+    """
+    Function matches rows and columns of the cost matrix in the same way as the original
+    min_cost_matching of deep_sort, with a single assignment of the whole matrix.
+    """
+
+    costMatrix = costMatrix.copy()
+    costMatrix[costMatrix > maxDistance] = maxDistance + 1e-5
+    indices = np.stack(linear_sum_assignment(costMatrix), axis=1)
+
+    matches, unmatchedTracks, unmatchedDetections = [], [], []
+    for col in range(costMatrix.shape[1]):
+        if col not in indices[:, 1]:
+            unmatchedDetections.append(col)
+    for row in range(costMatrix.shape[0]):
+        if row not in indices[:, 0]:
+            unmatchedTracks.append(row)
+    for row, col in indices:
+        if costMatrix[row, col] > maxDistance:
+            unmatchedTracks.append(row)
+            unmatchedDetections.append(col)
+        else:
+            matches.append((row, col))
+    return matches, unmatchedTracks, unmatchedDetections
+
+
+def randomGatedMatrix(rng, rows, cols, density):
+    """
+    Function returns a random cost matrix, where pairs farther from the diagonal than
+    density and random other pairs are gated, so that the matrix splits into components.
+    """
+
+    costMatrix = rng.uniform(0, 0.7, (rows, cols))
+    distance = np.abs(np.arange(rows)[:, None] / rows - np.arange(cols)[None, :] / cols)
+    gated = (distance > density) | (rng.random((rows, cols)) > 0.5 + density)
+    costMatrix[gated] = linear_assignment.INFTY_COST
+    return costMatrix
+
+
+@pytest.mark.parametrize("rows, cols", [(1, 1), (5, 9), (9, 5), (40, 40), (120, 100)])
+@pytest.mark.parametrize("density", [0.0, 0.02, 0.1, 0.5])
+def test_min_cost_matching_matches_single_assignment(rows, cols, density):
+    rng = np.random.default_rng(rows * cols)
+    maxDistance = 0.5
+
+    for _ in range(10):
+        costMatrix = randomGatedMatrix(rng, rows, cols, density)
+        expected = referenceMinCostMatching(costMatrix, maxDistance)
+        result = linear_assignment.min_cost_matching(
+            lambda tracks, detections, trackIndices, detectionIndices: costMatrix.copy(),
+            maxDistance,
+            list(range(rows)),
+            list(range(cols)),
+        )
+
+        # Same total cost and unmatched sets, and the same order which numbers new tracks
+        assert sum(costMatrix[r, c] for r, c in result[0]) == pytest.approx(
+            sum(costMatrix[r, c] for r, c in expected[0])
+        )
+        assert set(result[1]) == set(expected[1])
+        assert set(result[2]) == set(expected[2])
+        assert result == expected
+
+
+def test_min_cost_matching_maps_indices():
+    costMatrix = np.array([[0.1, 0.9, 0.9], [0.9, 0.9, 0.2]])
+    result = linear_assignment.min_cost_matching(
+        lambda tracks, detections, trackIndices, detectionIndices: costMatrix.copy(),
+        0.5,
+        list(range(8)),
+        list(range(8)),
+        [3, 7],
+        [2, 4, 6],
+    )
+
+    assert result == ([(3, 2), (7, 6)], [], [4])
@@ -0,0 +1,74 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import numpy as np
+import pytest
+from deep_sort import nn_matching
+
+
+class ReferenceMetric:
+    """
+    Class keeps samples of targets in lists and computes distances target by target in
+    the same way as the original NearestNeighborDistanceMetric of deep_sort.
+    """
+
+    def __init__(self, metric, budget):
+        self.metric = metric
+        self.budget = budget
+        self.samples = {}
+
+    def partial_fit(self, features, targets, activeTargets):
+        for feature, target in zip(features, targets):
+            self.samples.setdefault(target, []).append(feature)
+            if self.budget is not None:
+                self.samples[target] = self.samples[target][-self.budget :]
+        self.samples = {k: self.samples[k] for k in activeTargets}
+
+    def distance(self, features, targets):
+        costMatrix = np.zeros((len(targets), len(features)))
+        for i, target in enumerate(targets):
+            samples = np.asarray(self.samples[target], dtype=np.float64)
+            if self.metric == "cosine":
+                distances = nn_matching._cosine_distance(samples, features)
+            else:
+                distances = np.maximum(0.0, nn_matching._pdist(samples, features))
+            costMatrix[i, :] = distances.min(axis=0)
+        return costMatrix
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+@pytest.mark.parametrize("budget", [None, 1, 3])
+def test_distance_matches_per_target_lists(metric, budget):
+    rng = np.random.default_rng(7)
+    result = nn_matching.NearestNeighborDistanceMetric(metric, 0.2, budget)
+    reference = ReferenceMetric(metric, budget)
+
+    # More samples than the initial capacity of the buffers, targets come and go and
+    # every active target has some sample, as confirmed tracks in the tracker
+    active = list(range(10))
+    targets = np.array(active)
+    for step in range(40):
+        if step % 10 == 9:
+            active = active[2:] + [active[-1] + 1, active[-1] + 2]
+            targets = np.concatenate((targets, active[-2:]))
+        features = rng.normal(size=(len(targets), 16)).astype(np.float32)
+        result.partial_fit(features, targets, active)
+        reference.partial_fit(features, targets, active)
+
+        targets = rng.choice(active, rng.integers(1, 8))
+        queries = rng.normal(size=(6, 16)).astype(np.float32)
+        np.testing.assert_allclose(
+            result.distance(queries, active),
+            reference.distance(queries, active),
+            rtol=1e-5,
+            atol=1e-5,
+        )
+
+
+def test_distance_of_nothing_is_empty():
+    metric = nn_matching.NearestNeighborDistanceMetric("cosine", 0.2, 3)
+
+    assert metric.distance(np.zeros((0, 16)), []).shape == (0, 0)
@@ -0,0 +1,77 @@
+# Author: Jakub Sadilek
+#
+# Faculty of Information Technology
+# Brno University of Technology
+# 2022
+
+import numpy as np
+from deep_sort import kalman_filter
+from deep_sort.track import Track, TrackStore
+
+
+def createTracks(rng, kf, store, count):
+    """
+    Function creates tracks in the store together with copies of their states,
+    which are then updated by the original per-track Kalman filter steps.
+    """
+
+    tracks, states = [], []
+    for trackId in range(count):
+        measurement = rng.uniform([0, 0, 0.3, 20], [1000, 600, 1.0, 200])
+        mean, covariance = kf.initiate(measurement)
+        mean[4:] = rng.normal(0, 2, 4)
+        tracks.append(
+            Track(mean, covariance, trackId, 3, 30, None, None, None, store=store)
+        )
+        states.append((mean.copy(), covariance.copy()))
+    return tracks, states
+
+
+def test_track_store_keeps_states_after_swap_remove():
+    rng = np.random.default_rng(5)
+    kf = kalman_filter.KalmanFilter()
+    store = TrackStore(2)
+    tracks, states = createTracks(rng, kf, store, 9)
+
+    # First, middle and last track, the last stored track is moved to the freed slot
+    for index in [0, 4, 8]:
+        store.remove(tracks[index])
+    removed = {0, 4, 8}
+
+    assert store.size == 6
+    assert sorted(
+        track._slot for i, track in enumerate(tracks) if i not in removed
+    ) == list(range(6))
+    for i, (track, (mean, covariance)) in enumerate(zip(tracks, states)):
+        # Removed tracks keep a copy of their state in a store of their own
+        assert (track._store is store) == (i not in removed)
+        np.testing.assert_array_equal(track.mean, mean)
+        np.testing.assert_array_equal(track.covariance, covariance)
+
+
+def test_track_store_steps_match_per_track_steps():
+    rng = np.random.default_rng(6)
+    kf = kalman_filter.KalmanFilter()
+    store = TrackStore(2)
+    tracks, states = createTracks(rng, kf, store, 12)
+    store.remove(tracks[3])
+    store.remove(tracks[7])
+    tracks = [track for i, track in enumerate(tracks) if i not in [3, 7]]
+    states = [state for i, state in enumerate(states) if i not in [3, 7]]
+
+    for step in range(5):
+        store.predict(kf)
+        states = [kf.predict(mean, covariance) for mean, covariance in states]
+
+        # Only some tracks are matched in each step
+        matched = [i for i in range(len(tracks)) if (i + step) % 3 != 0]
+        measurements = np.array(
+            [states[i][0][:4] + rng.normal(0, [5, 5, 0.01, 2]) for i in matched]
+        )
+        store.update(kf, [tracks[i] for i in matched], measurements)
+        for i, measurement in zip(matched, measurements):
+            states[i] = kf.update(*states[i], measurement)
+
+    for track, (mean, covariance) in zip(tracks, states):
+        np.testing.assert_allclose(track.mean, mean, rtol=1e-9)
+        np.testing.assert_allclose(track.covariance, covariance, rtol=1e-9, atol=1e-9)
@@ -9,6 +9,27 @@
 const fs = require("fs");
 const path = require("path");
 
+/**
+ * Models selectable in the application with their default weights (relative to ./src).
+ */
+const models = {
+  high: { name: "yolo608", weights: "yolov3/yolov3.weights" },
+  medium: { name: "yolo320", weights: "yolov3/yolov3.weights" },
+  compact: { name: "yolov8n", weights: "yolov8/yolov8n.onnx" },
+  low: { name: "yolotiny", weights: "yolov3/yolov3-tiny.weights" },
+};
+
+/**
+ * Function returns models selectable in the application whose default weights exist.
+ *
+ * @returns {List} List with names of the models.
+ */
+const availableModels = () => {
+  return Object.keys(models).filter((model) =>
+    fs.existsSync(path.join(__dirname, "src", models[model].weights))
+  );
+};
+
 /**
  * Function converts the configuration received
  * from the user to the program parameters.
@@ -19,13 +40,9 @@ const path = require("path");
 const parseArgsCLI = (data) => {
   var args = [];
 
-  // Model
-  if (data.model === "high") {
-    args.push("--model", "yolo608");
-  } else {
-    // Medium
-    args.push("--model", "yolo320");
-  }
+  // Model, medium by default
+  const model = models[data.model] !== undefined ? data.model : "medium";
+  args.push("--model", models[model].name);
 
   // Car detection
   if (data.cars === true) {
@@ -128,4 +145,4 @@ const rmDirRecursive = (dir) => {
   }
 };
 
-module.exports = { parseArgsCLI, deleteFiles, rmDirRecursive };
+module.exports = { parseArgsCLI, availableModels, deleteFiles, rmDirRecursive };
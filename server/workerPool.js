@@ -0,0 +1,260 @@
+/**
+ * @author Jakub Sadilek
+ *
+ * Faculty of Information Technology
+ * Brno University of Technology
+ * 2022
+ */
+
+const readline = require("readline");
+const { spawn } = require("child_process");
+
+/**
+ * Pool of persistent python workers, which keep the models loaded between jobs.
+ * Jobs are passed to idle workers over stdin, the rest waits in a queue.
+ * Clients take turns in the queue, so that one client cannot hold all workers.
+ */
+class WorkerPool {
+  /**
+   * @param {String} program Path to the python worker program.
+   * @param {int} size Number of workers.
+   * @param {String} cwd Working directory of the workers.
+   * @param {int} maxJobs Maximum number of jobs running at once.
+   * @param {int} maxClientJobs Maximum number of jobs of one client running at once.
+   */
+  constructor(program, size, cwd, maxJobs = size, maxClientJobs = size) {
+    this.program = program;
+    this.cwd = cwd;
+    this.maxJobs = maxJobs;
+    this.maxClientJobs = maxClientJobs;
+    this.workers = [];
+    this.queue = [];
+    this.lastServed = new Map(); // Client => number of the last started job
+    this.startedJobs = 0;
+    this.failedStarts = 0; // Number of consecutive workers that failed before they were ready
+
+    for (var i = 0; i < size; i++) {
+      this.workers.push(this.spawnWorker());
+    }
+  }
+
+  /**
+   * Function starts a new python worker.
+   *
+   * @returns {Object} Worker with its process and currently processed job.
+   */
+  spawnWorker() {
+    const worker = {
+      process: spawn("python", [this.program], { cwd: this.cwd }),
+      job: undefined,
+      ready: false,
+      alive: true,
+    };
+
+    const output = readline.createInterface({ input: worker.process.stdout });
+    output.on("line", (line) => {
+      if (line.match(/^Worker: ready/)) {
+        worker.ready = true;
+        this.failedStarts = 0;
+      }
+
+      if (worker.job === undefined) {
+        return;
+      }
+
+      if (line.match(/^Progress:/)) {
+        worker.job.onProgress(parseInt(line.split(" ")[1]));
+      } else if (line.match(/^Finished:/)) {
+        this.finishJob(worker, parseInt(line.split(" ")[1]));
+      }
+    });
+
+    worker.process.stderr.on("data", (data) => {
+      console.log(data.toString());
+    });
+
+    worker.process.stdin.on("error", (err) => {
+      console.log("Python worker input error", err);
+    });
+
+    worker.process.on("error", (err) => {
+      console.log("Python worker error", err);
+    });
+
+    // Worker crashed or was killed due to cancellation of its job => replace it
+    worker.process.on("exit", (code) => {
+      console.log("Python worker ended with: " + code);
+      worker.alive = false;
+
+      const index = this.workers.indexOf(worker);
+      if (index !== -1 && worker.ready === true) {
+        this.workers[index] = this.spawnWorker();
+      } else if (index !== -1) {
+        // Worker that failed before it was ready would likely fail again => retry later
+        const delay = Math.min(1000 * 2 ** this.failedStarts, 60000);
+        this.failedStarts++;
+        setTimeout(() => {
+          if (this.workers[index] === worker) {
+            this.workers[index] = this.spawnWorker();
+            this.schedule();
+          }
+        }, delay);
+      }
+
+      if (worker.job !== undefined) {
+        this.finishJob(worker, code === null ? 1 : code);
+      } else {
+        this.schedule();
+      }
+    });
+
+    return worker;
+  }
+
+  /**
+   * Function adds a new job into the queue.
+   *
+   * @param {String} client Identifier of the client submitting the job.
+   * @param {List} args Program parameters of the job.
+   * @param {Object} handlers Callbacks of the job:
+   *  onQueue(position) called when position of the job in the queue changes (1 is the next),
+   *  onProgress(progress) called with progress of the job in percents,
+   *  onFinish(code) called with exit code when the job is finished.
+   * @returns {Object} Job, which can be cancelled by cancel.
+   */
+  submit(client, args, handlers) {
+    const job = { client, args, ...handlers, position: undefined };
+    this.queue.push(job);
+    this.schedule();
+    return job;
+  }
+
+  /**
+   * Function cancels the job. Queued job is only removed, worker processing the job is killed.
+   *
+   * @param {Object} job Job returned by submit.
+   * @returns {boolean} True if the job was removed from the queue before it started.
+   */
+  cancel(job) {
+    const index = this.queue.indexOf(job);
+    if (index !== -1) {
+      this.queue.splice(index, 1);
+      this.schedule();
+      return true;
+    }
+
+    const worker = this.workers.find((worker) => worker.job === job);
+    if (worker !== undefined) {
+      worker.process.kill("SIGINT");
+    }
+    return false;
+  }
+
+  /**
+   * Function returns number of running jobs of the client.
+   *
+   * @param {String} client Identifier of the client.
+   * @returns {int} Number of jobs.
+   */
+  runningJobs(client) {
+    return this.workers.filter(
+      (worker) => worker.job !== undefined && worker.job.client === client
+    ).length;
+  }
+
+  /**
+   * Function selects the queued job to be started next. Jobs of clients with less running jobs
+   * go first, then jobs of the client served least recently, then the oldest job.
+   *
+   * @returns {int} Index of the job in the queue or -1 if no job can be started.
+   */
+  nextJob() {
+    var next = -1;
+    var nextKey = undefined;
+
+    this.queue.forEach((job, index) => {
+      const running = this.runningJobs(job.client);
+      if (running >= this.maxClientJobs) {
+        return;
+      }
+
+      const served = this.lastServed.has(job.client)
+        ? this.lastServed.get(job.client)
+        : -1;
+      const key = [running, served];
+      if (
+        nextKey === undefined ||
+        key[0] < nextKey[0] ||
+        (key[0] === nextKey[0] && key[1] < nextKey[1])
+      ) {
+        next = index;
+        nextKey = key;
+      }
+    });
+
+    return next;
+  }
+
+  /**
+   * Function passes queued jobs to idle workers and reports positions of waiting jobs.
+   * Queued jobs fail when no worker is alive.
+   */
+  schedule() {
+    // No worker is alive (all failed at startup) => waiting jobs fail instead of waiting forever
+    if (this.workers.every((worker) => worker.alive === false)) {
+      for (const job of this.queue.splice(0)) {
+        setImmediate(() => job.onFinish(1));
+      }
+    }
+
+    for (const worker of this.workers) {
+      const running = this.workers.filter((w) => w.job !== undefined).length;
+      if (running >= this.maxJobs) {
+        break;
+      }
+
+      if (worker.job === undefined && worker.alive === true) {
+        const index = this.nextJob();
+        if (index === -1) {
+          break;
+        }
+
+        worker.job = this.queue.splice(index, 1)[0];
+        this.lastServed.set(worker.job.client, this.startedJobs++);
+        const message = JSON.stringify({ args: worker.job.args });
+        worker.process.stdin.write(message + "\n");
+      }
+    }
+
+    // Nobody is waiting => forget order of clients without running jobs
+    if (this.queue.length === 0) {
+      for (const client of this.lastServed.keys()) {
+        if (this.runningJobs(client) === 0) {
+          this.lastServed.delete(client);
+        }
+      }
+    }
+
+    this.queue.forEach((job, index) => {
+      if (job.position !== index + 1) {
+        job.position = index + 1;
+        job.onQueue(job.position);
+      }
+    });
+  }
+
+  /**
+   * Function reports the end of the job and schedules the next one.
+   *
+   * @param {Object} worker Worker which processed the job.
+   * @param {int} code Exit code of the job.
+   */
+  finishJob(worker, code) {
+    const job = worker.job;
+    worker.job = undefined;
+    job.onFinish(code);
+    this.schedule();
+  }
+}
+
+module.exports = WorkerPool;